@@ -0,0 +1,42 @@
+"""Add trigram search indexes
+
+Revision ID: 5d0c3a9e41b7
+Revises: 87b1ad15c0fa
+Create Date: 2026-10-18 09:12:41.207315
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d0c3a9e41b7"
+down_revision: Union[str, None] = "87b1ad15c0fa"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # GIN trigram indexes serve LIKE/ILIKE '%search%' (no leading-wildcard seq
+    # scan) as well as the similarity operators used by search_mode=fuzzy
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_posts_title_trgm",
+        "posts",
+        ["title"],
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_users_username_trgm",
+        "users",
+        ["username"],
+        postgresql_using="gin",
+        postgresql_ops={"username": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_username_trgm", table_name="users")
+    op.drop_index("ix_posts_title_trgm", table_name="posts")
@@ -0,0 +1,75 @@
+"""Add follows and timelines
+
+Revision ID: 7cc821b2ec74
+Revises: 5d0c3a9e41b7
+Create Date: 2026-10-18 16:04:27.518093
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7cc821b2ec74"
+down_revision: Union[str, None] = "5d0c3a9e41b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("follower_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_users_follower_count", "users", ["follower_count"])
+    op.create_index("ix_posts_owner_id_id", "posts", ["owner_id", "id"])
+    op.create_table(
+        "follows",
+        sa.Column("follower_id", sa.Integer(), nullable=False),
+        sa.Column("followee_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "followed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["follower_id"], ["users.id"], ondelete="CASCADE", onupdate="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["followee_id"], ["users.id"], ondelete="CASCADE", onupdate="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("follower_id", "followee_id"),
+        sa.CheckConstraint("follower_id <> followee_id", name="check_no_self_follow"),
+    )
+    op.create_index(
+        "ix_follows_followee_id_follower_id",
+        "follows",
+        ["followee_id", "follower_id"],
+    )
+    op.create_table(
+        "timelines",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["users.id"], ondelete="CASCADE", onupdate="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["post_id"], ["posts.id"], ondelete="CASCADE", onupdate="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("user_id", "post_id"),
+    )
+    op.create_index("ix_timelines_post_id", "timelines", ["post_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_timelines_post_id", table_name="timelines")
+    op.drop_table("timelines")
+    op.drop_index("ix_follows_followee_id_follower_id", table_name="follows")
+    op.drop_table("follows")
+    op.drop_index("ix_posts_owner_id_id", table_name="posts")
+    op.drop_index("ix_users_follower_count", table_name="users")
+    op.drop_column("users", "follower_count")
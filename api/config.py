@@ -1,14 +1,21 @@
+import contextlib
+import copy
+import glob
+import json
 import logging
 import os
+import queue
 import sys
+import threading
 from types import FrameType
-from typing import List, cast
+from typing import Any, List, Literal, Optional, cast
 
 from loguru import logger
 from pydantic import AnyHttpUrl
 from pydantic_settings import BaseSettings
 
-with open("./api/VERSION") as version_file:
+# Relative to this file, not the working directory
+with open(os.path.join(os.path.dirname(__file__), "VERSION")) as version_file:
     __version__, API_V1_STR, API_PROJECT_NAME, package_version = map(
         str.strip, version_file.readlines()
     )
@@ -16,6 +23,12 @@ with open("./api/VERSION") as version_file:
 
 class LoggingSettings(BaseSettings):
     LOGGING_LEVEL: int = logging.INFO  # logging levels are type int
+    LOGGING_JSON: bool = True  # one JSON object per line, False for plain text
+    LOGGING_FILE_ROTATION: str = "50 MB"
+    LOGGING_FILE_RETENTION: int = 10  # log files to keep, of all processes
+    # Share of successful requests written to the access log (errors and
+    # server errors are always logged)
+    LOGGING_ACCESS_SAMPLE_RATE: float = 0.1
 
 
 class Settings(BaseSettings):
@@ -29,6 +42,89 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     FASTAPI_PORT: int
 
+    # Database connection pool, per engine and per worker process
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a connection
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 to never recycle
+    DB_POOL_PRE_PING: bool = True
+    DB_ECHO: bool = False  # log every SQL statement
+
+    # Read replicas: hostnames (JSON list) with the credentials and database of
+    # DB_HOSTNAME. GET routes read from a random replica that is up and at
+    # most DB_REPLICA_MAX_LAG_SECONDS behind, else from the primary. After a
+    # write the client reads from the primary for DB_READ_YOUR_WRITES_SECONDS
+    DB_REPLICA_HOSTNAMES: List[str] = []
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = 5.0
+    DB_REPLICA_CONNECT_TIMEOUT: int = 3  # seconds
+    DB_READ_YOUR_WRITES_SECONDS: int = 10
+
+    # Warm up each worker in the background at startup (api.warmup): open
+    # WARMUP_DB_CONNECTIONS pooled connections per engine (at most
+    # DB_POOL_SIZE), load bcrypt and jose, run the response models.
+    # GET /health/ready answers 503 until it's done
+    WARMUP_ENABLED: bool = True
+    WARMUP_DB_CONNECTIONS: int = 2
+
+    # Password hashing (bcrypt) runs off the event loop in a bounded pool
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_WORKERS: int = os.cpu_count() or 1
+
+    # Verified JWT claims are cached per worker, keyed by a digest of the
+    # token, for at most this long and never past the token's exp
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = 300
+    AUTH_TOKEN_CACHE_MAXSIZE: int = 10_000
+
+    # Authenticated user records are cached per worker, keyed by user id.
+    # AUTH_CLAIMS_ONLY trusts the JWT claims and skips the DB (and cache)
+    AUTH_USER_CACHE_TTL_SECONDS: int = 60
+    AUTH_USER_CACHE_MAXSIZE: int = 10_000
+    AUTH_CLAIMS_ONLY: bool = False
+
+    # Token bucket rate limits per worker, in requests per minute (also the
+    # burst size). Login and signup are keyed by client IP, the post and user
+    # write routes by the JWT user_id. 0 disables a limit
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOGIN_PER_MINUTE: int = 10
+    RATE_LIMIT_SIGNUP_PER_MINUTE: int = 5
+    RATE_LIMIT_USER_WRITES_PER_MINUTE: int = 120
+    RATE_LIMIT_MAXSIZE: int = 100_000  # tracked IPs/users per limit
+
+    # Serialized posts of /posts/id/{id} and /posts/latest, cached per worker.
+    # Updates/deletes in the same worker invalidate, other changes (owner
+    # renamed, other workers) show up after the TTL
+    POST_CACHE_TTL_SECONDS: int = 60
+    POST_CACHE_MAXSIZE: int = 10_000
+
+    # GET /feed: posts are copied to the timelines of the author's followers
+    # on create, unless the author has more than FEED_FANOUT_MAX_FOLLOWERS
+    # (then they are read from the author's posts). A new follow adds the
+    # followee's latest FEED_BACKFILL_POSTS posts
+    FEED_FANOUT_MAX_FOLLOWERS: int = 10_000
+    FEED_BACKFILL_POSTS: int = 20
+
+    # Max page size of the list routes (/posts/get, /users/get)
+    PAGINATION_MAX_LIMIT: int = 100
+
+    # POST /posts/bulk: rows per multi-row INSERT and items per request, bytes
+    # of a JSON array body (checked before it is parsed) and of an NDJSON line
+    POST_BULK_BATCH_SIZE: int = 500
+    POST_BULK_MAX_ITEMS: int = 10_000
+    POST_BULK_MAX_BYTES: int = 10 * 1024 * 1024
+    POST_BULK_MAX_LINE_BYTES: int = 64 * 1024
+
+    # /posts/export, /users/export: rows fetched per server-side cursor batch
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Debug: report the number of SQL statements of each request in the
+    # X-Query-Count response header (catches N+1 queries)
+    QUERY_COUNT_HEADER: bool = False
+
+    # Superusers can profile a request with `X-Profile: 1` or `?profile=1`
+    PROFILING_ENABLED: bool = True
+    PROFILING_INTERVAL_SECONDS: float = 0.001  # stack sampling interval
+
     # Meta
     logging: LoggingSettings = LoggingSettings()
 
@@ -83,37 +179,208 @@ class InterceptHandler(logging.Handler):
         )
 
 
+class QueuedStream:
+    """File-like sink target: write() only queues, a thread writes and flushes.
+
+    Loguru flushes stream sinks after every message, which blocks the caller
+    whenever stderr is a slow pipe (container log drivers). Loguru's own
+    enqueue=True pickles every record through a multiprocessing queue, which
+    costs the caller more than the write it saves.
+    """
+
+    def __init__(self, stream: Any) -> None:
+        self._stream = stream
+        self._start()
+        # Threads don't survive fork: give preforked workers their own writer
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self) -> None:
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name="log-writer", daemon=True).start()
+
+    def write(self, message: str) -> None:
+        self._queue.put(message)
+
+    def flush(self) -> None:
+        """No-op, the writer thread flushes."""
+
+    def isatty(self) -> bool:
+        # Loguru only colorizes terminals
+        return self._stream.isatty()
+
+    def drain(self) -> None:
+        """Block until every message queued so far is written."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def _run(self) -> None:
+        while True:
+            message: Any = self._queue.get()
+            if isinstance(message, threading.Event):
+                message.set()
+                continue
+            try:
+                self._stream.write(message)
+                self._stream.flush()
+            except Exception:  # pragma: no cover
+                pass  # a broken stderr or full disk must not kill the writer
+
+
+class RawLog:
+    """File-like front of a loguru logger: write() logs a message formatted
+    by another logger as is.
+
+    Lets QueuedStream write to loguru's path sinks (rotation, retention) off
+    the caller's thread.
+    """
+
+    def __init__(self, logger_: Any) -> None:
+        self._logger = logger_
+
+    def write(self, message: Any) -> None:
+        self._logger.opt(raw=True).log(message.record["level"].no, message)
+
+    def flush(self) -> None:
+        """No-op, loguru's file sinks are line buffered."""
+
+
+def _json_format(record: dict) -> str:
+    """Loguru format: the record as one JSON line.
+
+    Both sinks get the same record, so it is serialized once.
+    """
+    if "json" in record["extra"]:
+        return "{extra[json]}\n"
+    entry: dict = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+        **{key: value for key, value in record["extra"].items() if key != "json"},
+    }
+    if record["exception"] is not None:
+        entry["exception"] = repr(record["exception"].value)
+    record["extra"]["json"] = json.dumps(entry, default=str)
+    return "{extra[json]}\n"
+
+
+def _log_file_pid(path: str) -> Optional[int]:
+    pid: str = os.path.basename(path).split("_")[1]  # file_<pid>_<time>.log
+    return int(pid) if pid.isdigit() else None
+
+
+def _running(pid: Optional[int]) -> bool:
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # pragma: no cover (another user's process)
+        pass
+    return True
+
+
+def retain_log_files(log_dir: str, keep: int) -> None:
+    """Delete all but the newest `keep` log files of every process.
+
+    Every process (gunicorn worker) writes file_<pid>_<time>.log, the
+    retention applies to all of them so files of earlier runs go too. The
+    newest file of a running process is never deleted: it may be open.
+    """
+    files: list[tuple[float, str]] = []
+    for path in glob.glob(os.path.join(log_dir, "file_*.log")):
+        with contextlib.suppress(OSError):  # deleted by another worker
+            files.append((os.path.getmtime(path), path))
+    files.sort(reverse=True)
+    newest: dict[Optional[int], str] = {}
+    for _, path in files:
+        newest.setdefault(_log_file_pid(path), path)
+    in_use: set[str] = {path for pid, path in newest.items() if _running(pid)}
+    for _, path in files[keep:]:
+        if path not in in_use:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+
+# stderr and file sinks of setup_app_logging, drained by drain_app_logging.
+# _file_logger is a logger of its own with only the log file sink
+_stderr: Optional[QueuedStream] = None
+_file: Optional[QueuedStream] = None
+_file_logger: Any = None
+
+
 def setup_app_logging(config: Settings) -> None:
-    """Prepare custom logging for our application."""
+    """Prepare custom logging for our application.
+
+    Both sinks are written by background threads (QueuedStream): stderr, and
+    the rotating log file through a loguru path sink on a logger of its own
+    (RawLog), so the caller only queues the message. The file is line
+    buffered, no fsync.
+    Call `drain_app_logging()` on shutdown. Preforked workers call it again
+    to get their own log file.
+    """
+    global _stderr, _file, _file_logger
 
     log_dir = "logs"
     os.makedirs(log_dir, exist_ok=True)  # Create a log directory if it doesn't exist
 
     # Format for the log messages
-    log_format = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+    log_format: Any = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | {extra[request_id]} - <level>{message}</level>"
+    if config.logging.LOGGING_JSON:
+        log_format = _json_format
 
     # Configure Loguru logger
     logger.remove()  # Remove default logger
+    logger.configure(extra={"request_id": None})
+    if _file_logger is None:
+        # Loguru's recipe for independent loggers, copied without handlers
+        _file_logger = copy.deepcopy(logger)
+        _file = QueuedStream(RawLog(_file_logger))
+    else:
+        _file.drain()
+        _file_logger.remove()  # close the previous file
+    # The pid keeps gunicorn workers from writing to the same file. The
+    # retention covers the files of all of them, on startup and rotation
+    keep: int = config.logging.LOGGING_FILE_RETENTION
+    retain_log_files(log_dir, keep)
+    _file_logger.add(
+        os.path.join(log_dir, f"file_{os.getpid()}_{{time}}.log"),
+        rotation=config.logging.LOGGING_FILE_ROTATION,
+        retention=lambda _: retain_log_files(log_dir, keep),
+        level=0,  # filtered by the file sink of logger below
+        format="{message}",
+    )
+    if _stderr is None:
+        _stderr = QueuedStream(sys.stderr)
     logger.add(
-        sys.stderr, level=config.logging.LOGGING_LEVEL, format=log_format
+        _stderr, level=config.logging.LOGGING_LEVEL, format=log_format
     )  # CLI sink
     logger.add(
-        os.path.join(log_dir, "file_{time}.log"),
-        rotation="100 KB",
-        retention=1,
-        level=config.logging.LOGGING_LEVEL,
-        format=log_format,
+        _file, level=config.logging.LOGGING_LEVEL, format=log_format, colorize=False
     )  # File sink
 
-    LOGGERS: tuple[str, str] = ("uvicorn.asgi", "uvicorn.access")
+    LOGGERS: tuple[str, ...] = ("uvicorn.asgi", "uvicorn.error")
     logging.getLogger().handlers = [InterceptHandler()]
     for logger_name in LOGGERS:
         logging_logger: logging = logging.getLogger(logger_name)
         logging_logger.handlers = [InterceptHandler(level=config.logging.LOGGING_LEVEL)]
+    # Replaced by the sampled access log of middleware.RequestLogMiddleware
+    logging.getLogger("uvicorn.access").disabled = True
 
     # logger.configure(
     #     handlers=[{"sink": sys.stderr, "level": config.logging.LOGGING_LEVEL}]
     # )
 
 
+def drain_app_logging() -> None:
+    """Write out the queued stderr and file log messages."""
+    for stream in (_stderr, _file):
+        if stream is not None:
+            stream.drain()
+
+
 settings = Settings()
@@ -1,2 +1,14 @@
-from .database import Base, engine, get_db
-from . import models
\ No newline at end of file
+from .database import (
+    Base,
+    async_engine,
+    engine,
+    get_async_db,
+    get_async_read_db,
+    get_async_sessionmaker,
+    get_db,
+    read_replicas,
+)
+from . import models, timeline
+from .pool import pool_status
+from .query_counter import count_queries
+from .replica import READ_PRIMARY_COOKIE
@@ -1,9 +1,16 @@
+from typing import Any, AsyncGenerator, Generator, Optional
+
+from fastapi import Request
 from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from typing import Generator, Any
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
 from api.config import settings
 
+from .pool import TimedAsyncAdaptedQueuePool, TimedQueuePool
+from .replica import READ_PRIMARY_COOKIE, Replica, ReplicaSet
+
 # SQLALCHEMY_DATABASE_URL = "postgresql://<username>:<password>@<ip-address>:<port>/<dbname>"
 # Neon database
 SQLALCHEMY_DATABASE_URL: str = (
@@ -12,14 +19,61 @@ SQLALCHEMY_DATABASE_URL: str = (
 # Local database
 # SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.DB_USERNAME}:{settings.DB_PASS}@{settings.DB_HOSTNAME}:{settings.DB_PORT}/{settings.DB_NAME}"
 
+# Async (psycopg 3) database, used by the API routes
+SQLALCHEMY_ASYNC_DATABASE_URL: str = (
+    f"postgresql+psycopg_async://{settings.DB_USERNAME}:{settings.DB_PASS}@{settings.DB_HOSTNAME}/{settings.DB_NAME}?sslmode=require"
+)
+# Local database
+# SQLALCHEMY_ASYNC_DATABASE_URL = f"postgresql+psycopg_async://{settings.DB_USERNAME}:{settings.DB_PASS}@{settings.DB_HOSTNAME}:{settings.DB_PORT}/{settings.DB_NAME}"
+
+# Pool settings shared by both engines
+POOL_KWARGS: dict[str, Any] = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    "echo": settings.DB_ECHO,
+}
+
+# Sync engine: alembic, scripts and tests
 engine: create_engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     # FOLLOWING ARGUMENT IS ONLY FOR SQLITE DATABASE
     # connect_args={"check_same_thread": False},
-    echo=True,
+    poolclass=TimedQueuePool,
+    **POOL_KWARGS,
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: API routes, never blocks the event loop on a DB round trip
+async_engine: create_async_engine = create_async_engine(
+    SQLALCHEMY_ASYNC_DATABASE_URL,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    **POOL_KWARGS,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+# Read replicas (DB_REPLICA_HOSTNAMES), same credentials and database
+read_replicas = ReplicaSet(
+    [
+        Replica(
+            name=hostname,
+            engine=create_async_engine(
+                f"postgresql+psycopg_async://{settings.DB_USERNAME}:{settings.DB_PASS}@{hostname}/{settings.DB_NAME}?sslmode=require",
+                poolclass=TimedAsyncAdaptedQueuePool,
+                connect_args={"connect_timeout": settings.DB_REPLICA_CONNECT_TIMEOUT},
+                **POOL_KWARGS,
+            ),
+            max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+            check_interval=settings.DB_REPLICA_CHECK_INTERVAL_SECONDS,
+        )
+        for hostname in settings.DB_REPLICA_HOSTNAMES
+    ]
+)
+
 Base: declarative_base = declarative_base()
 
 
@@ -35,3 +89,54 @@ def get_db() -> Generator[sessionmaker, Any, None]:
         yield db
     finally:
         db.close()
+
+
+# Session factory for work that outlives the request (streaming responses)
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Get the async session factory.
+
+    Returns:
+        AsyncSessionLocal: sessions are opened (and closed) by the caller
+    """
+    return AsyncSessionLocal
+
+
+# Async Dependency
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Get async database connection.
+
+    Yields:
+        AsyncSession: database connection
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Async Dependency of the read-only (GET) routes
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Get an async database connection for reads.
+
+    A usable read replica when one is configured, else the primary. Clients
+    with the read_primary cookie (set after their writes) read from the
+    primary, so they see their own writes. Sessions of a replica have
+    `db.info["replica"]` set to its name.
+
+    Yields:
+        AsyncSession: database connection, don't write with it
+    """
+    replica: Optional[Replica] = None
+    if read_replicas and READ_PRIMARY_COOKIE not in request.cookies:
+        replica = read_replicas.choose()
+    if replica is None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    async with replica.sessionmaker() as db:
+        db.info["replica"] = replica.name
+        try:
+            yield db
+        except OperationalError:
+            # Went down (or timed out) since the last check, spare the next
+            # requests until a check finds it healthy again
+            replica.mark_down()
+            raise
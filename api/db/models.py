@@ -1,9 +1,25 @@
-from sqlalchemy import (Boolean, CheckConstraint, Column, DateTime, ForeignKey,
-                        Integer, String, func)
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    CheckConstraint,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    event,
+    func,
+)
+from sqlalchemy.orm import Mapped, relationship
 
 from .database import Base
-from typing import Any
+
+# Trigram (GIN) indexes back LIKE/ILIKE '%search%' and similarity search
+event.listen(
+    Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+)
+
 
 class User(Base):
     """User model/Table.
@@ -28,9 +44,11 @@ class User(Base):
     )
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
+    # Kept by the follow and user delete routes, picks feed fan-out on write/read
+    follower_count = Column(Integer, nullable=False, server_default="0", index=True)
 
     # CheckConstraint to enforce email/password policy
-    __table_args__: tuple[CheckConstraint, CheckConstraint, CheckConstraint] = (
+    __table_args__: tuple[CheckConstraint, CheckConstraint, CheckConstraint, Index] = (
         CheckConstraint(
             "LENGTH(username) >= 3 AND LENGTH(username) <= 15 ",
             name="check_username_policy",
@@ -48,6 +66,12 @@ class User(Base):
             "AND password ~ '.*[!@#$%^*()_+]+.*'",  # At least one special character
             name="check_password_policy",
         ),
+        Index(
+            "ix_users_username_trgm",
+            "username",
+            postgresql_using="gin",
+            postgresql_ops={"username": "gin_trgm_ops"},
+        ),
     )
 
 
@@ -73,10 +97,13 @@ class Posts(Base):
         ForeignKey("users.id", ondelete="CASCADE", onupdate="CASCADE"),
         nullable=False,
     )
-    owner: Any = relationship("User")
+    owner: Mapped["User"] = relationship("User")
+
+    # INSERT ... RETURNING the server defaults (post_created_at)
+    __mapper_args__: dict[str, bool] = {"eager_defaults": True}
 
     # Enforce character limits
-    __table_args__: tuple[CheckConstraint, CheckConstraint] = (
+    __table_args__: tuple[CheckConstraint, CheckConstraint, Index, Index] = (
         CheckConstraint(
             "LENGTH(title) >=1 AND LENGTH(title) <= 80", name="title_length_constraint"
         ),
@@ -84,9 +111,73 @@ class Posts(Base):
             "LENGTH(content) >=1 AND LENGTH(content) <= 180",
             name="content_length_constraint",
         ),
+        Index(
+            "ix_posts_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        # Newest posts of an owner first (feed fan-out on read, unfollow)
+        Index("ix_posts_owner_id_id", "owner_id", "id"),
+    )
+
+
+class Follow(Base):
+    """Follow model/Table: follower_id follows followee_id.
+
+    Args:
+        Base (object): from sqlalchemy.ext.declarative import declarative_base
+    """
+
+    __tablename__: str = "follows"
+
+    follower_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True,
+    )
+    followee_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True,
+    )
+    followed_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__: tuple[CheckConstraint, Index] = (
+        CheckConstraint("follower_id <> followee_id", name="check_no_self_follow"),
+        # Followers of a user (fan-out on write)
+        Index("ix_follows_followee_id_follower_id", "followee_id", "follower_id"),
     )
 
 
+class Timeline(Base):
+    """Timeline model/Table: the materialized home timeline of user_id, one
+    row per post fanned out to it (api.db.timeline).
+
+    Args:
+        Base (object): from sqlalchemy.ext.declarative import declarative_base
+    """
+
+    __tablename__: str = "timelines"
+
+    # The primary key serves a feed page as one backward index range scan
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True,
+    )
+    post_id = Column(
+        Integer,
+        ForeignKey("posts.id", ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True,
+    )
+
+    # Deleting a post deletes its timeline rows
+    __table_args__: tuple[Index] = (Index("ix_timelines_post_id", "post_id"),)
+
+
 class TestSQLALCHEMY(Base):
     """TestSQLALCHEMY model/Table.
 
@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import Any
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolWaitStats:
+    """How long checkouts waited for a connection (pool or new connection)."""
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.total_seconds: float = 0.0
+        self.max_seconds: float = 0.0
+        self.timeouts: int = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.timeouts += timed_out
+
+
+class _TimedPoolMixin:
+    """Times QueuePool._do_get, i.e. the wait of every connection checkout.
+
+    Also keeps the configured max_overflow (QueuePool only has it private).
+    """
+
+    wait_stats: PoolWaitStats
+    max_overflow: int
+
+    def __init__(self, *args: Any, max_overflow: int = 10, **kwargs: Any) -> None:
+        # 10 is QueuePool's default
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self) -> Any:
+        start: float = time.perf_counter()
+        timed_out: bool = False
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        except TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.wait_stats.record(time.perf_counter() - start, timed_out)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(pool: Any) -> dict[str, Any]:
+    """Connections and checkout waits of a TimedQueuePool (or async one).
+
+    Args:
+        pool: engine.pool (or async_engine.pool)
+    Returns:
+        dict: matches schemas.PoolStatus
+    """
+    stats: PoolWaitStats = pool.wait_stats
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": pool.max_overflow,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "waits": stats.count,
+        "wait_avg_ms": round(1000 * stats.total_seconds / max(1, stats.count), 3),
+        "wait_max_ms": round(1000 * stats.max_seconds, 3),
+        "timeouts": stats.timeouts,
+    }
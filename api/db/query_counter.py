@@ -0,0 +1,60 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    """Number of SQL statements executed while the counter is active, and the
+    time spent executing them."""
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.seconds: float = 0.0
+
+
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar(
+    "query_counter", default=None
+)
+
+
+# Registered on the Engine class so every engine (sync, async, tests) counts
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn: Any, *args: Any) -> None:
+    counter: Optional[QueryCounter] = _current_counter.get()
+    if counter is not None:
+        counter.count += 1
+        conn.info["query_start"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _time_query(conn: Any, *args: Any) -> None:
+    counter: Optional[QueryCounter] = _current_counter.get()
+    start: Optional[float] = conn.info.pop("query_start", None)
+    if counter is not None and start is not None:
+        counter.seconds += time.perf_counter() - start
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Count the SQL statements run in this context (request, task or test).
+
+    Nested calls share the outer counter, so every middleware of a request
+    sees the same numbers.
+
+    Yields:
+        QueryCounter: `.count` and `.seconds` grow as statements are executed
+    """
+    current: Optional[QueryCounter] = _current_counter.get()
+    if current is not None:
+        yield current
+        return
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
@@ -0,0 +1,100 @@
+import asyncio
+import random
+import time
+from typing import Any, Optional
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+# Set (by middleware.ReadYourWritesMiddleware) after a successful write, reads
+# of the client go to the primary while it lives
+READ_PRIMARY_COOKIE = "read_primary"
+
+# Seconds of WAL the replica has received but not replayed yet. 0 when caught
+# up (an idle primary doesn't make a replica look behind) and on a primary
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+class Replica:
+    """A read replica: its engine, sessions and last measured lag.
+
+    Args:
+        name (str): shown in the admin status (the hostname)
+        engine (AsyncEngine): engine of the replica
+        max_lag (float): seconds behind the primary at which it stops serving
+        check_interval (float): seconds between lag checks
+    """
+
+    def __init__(
+        self, name: str, engine: AsyncEngine, max_lag: float, check_interval: float
+    ) -> None:
+        self.name: str = name
+        self.engine: AsyncEngine = engine
+        self.sessionmaker = async_sessionmaker(
+            bind=engine, autoflush=False, expire_on_commit=False
+        )
+        self.max_lag: float = max_lag
+        self.check_interval: float = check_interval
+        self.lag: Optional[float] = None  # None: not checked yet or down
+        self.checked_at: float = float("-inf")
+        self._check_task: Optional[asyncio.Task] = None
+
+    @property
+    def usable(self) -> bool:
+        return self.lag is not None and self.lag <= self.max_lag
+
+    def mark_down(self) -> None:
+        """Stop routing reads here until the next successful check."""
+        self.lag = None
+
+    def check_soon(self) -> None:
+        """Start a lag check in the background when one is due.
+
+        Requests never wait for it: until it finishes they use the last
+        result (and the primary if there is none).
+        """
+        if self._check_task is not None and not self._check_task.done():
+            return
+        if time.monotonic() - self.checked_at < self.check_interval:
+            return
+        self.checked_at = time.monotonic()
+        self._check_task = asyncio.get_running_loop().create_task(self.check())
+
+    async def check(self) -> None:
+        try:
+            async with self.engine.connect() as connection:
+                self.lag = float(await connection.scalar(LAG_QUERY))
+        except Exception as e:
+            if self.lag is not None:
+                logger.warning("Read replica {} is down: {!r}", self.name, e)
+            self.lag = None
+        self.checked_at = time.monotonic()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "lag_seconds": self.lag,
+            "usable": self.usable,
+        }
+
+
+class ReplicaSet:
+    """Read replicas that reads are spread over at random."""
+
+    def __init__(self, replicas: list[Replica]) -> None:
+        self.replicas: list[Replica] = replicas
+
+    def choose(self) -> Optional[Replica]:
+        """A random usable replica, None when reads should go to the primary."""
+        for replica in self.replicas:
+            replica.check_soon()
+        usable: list[Replica] = [r for r in self.replicas if r.usable]
+        return random.choice(usable) if usable else None
+
+    def __len__(self) -> int:
+        return len(self.replicas)
@@ -0,0 +1,166 @@
+"""Home timelines: the posts of the users someone follows, newest first.
+
+Posts are fanned out on write: create_post inserts one `timelines` row per
+follower of the author, so a feed page is one backward range scan of the
+timeline primary key, however many users the reader follows.
+
+Authors with more than FEED_FANOUT_MAX_FOLLOWERS followers are fanned out on
+read instead (one insert per post would be one row per follower): their
+posts, and the reader's own, are merged in at read time, each source one
+range scan of ix_posts_owner_id_id limited to the page size. Only the few
+accounts over the threshold take that path, not every followed user. An
+author dropping back to the threshold is backfilled for all their followers
+(backfill_followers), as their posts in between are in no timeline.
+"""
+
+from typing import Any, Optional
+
+from sqlalchemy import delete, literal, select, true, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from api.config import settings
+
+from . import models
+
+
+def fans_out_on_write(user: models.User) -> bool:
+    return user.follower_count <= settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+async def fan_out(db: AsyncSession, author: models.User, post_ids: list[int]) -> None:
+    """Add the posts `post_ids` of `author` to the timelines of its followers.
+
+    A no-op for authors without followers or fanned out on read. One
+    INSERT ... SELECT, in the transaction of the posts.
+    """
+    if not post_ids or not author.follower_count or not fans_out_on_write(author):
+        return
+    rows: Any = (
+        select(models.Follow.follower_id, models.Posts.id)
+        .join(models.Posts, models.Posts.owner_id == models.Follow.followee_id)
+        .filter(models.Follow.followee_id == author.id, models.Posts.id.in_(post_ids))
+    )
+    await db.execute(
+        pg_insert(models.Timeline)
+        .from_select(["user_id", "post_id"], rows)
+        .on_conflict_do_nothing()
+    )
+
+
+async def backfill(db: AsyncSession, user_id: int, followee: models.User) -> None:
+    """Add the latest FEED_BACKFILL_POSTS posts of a user just followed."""
+    if not fans_out_on_write(followee):
+        return  # read from the posts table anyway
+    latest: Any = (
+        select(literal(user_id), models.Posts.id)
+        .filter(models.Posts.owner_id == followee.id)
+        .order_by(models.Posts.id.desc())
+        .limit(settings.FEED_BACKFILL_POSTS)
+    )
+    await db.execute(
+        pg_insert(models.Timeline)
+        .from_select(["user_id", "post_id"], latest)
+        .on_conflict_do_nothing()
+    )
+
+
+async def backfill_followers(db: AsyncSession, author_ids: list[int]) -> None:
+    """Add the latest FEED_BACKFILL_POSTS posts of each author to the
+    timelines of all their followers.
+
+    For authors back down to FEED_FANOUT_MAX_FOLLOWERS followers: read()
+    stops merging in their posts, and those created while they were over
+    were never fanned out. One INSERT ... SELECT per author, of at most
+    FEED_FANOUT_MAX_FOLLOWERS * FEED_BACKFILL_POSTS rows.
+    """
+    for author_id in author_ids:
+        latest: Any = _latest_posts(
+            author_id, settings.FEED_BACKFILL_POSTS, None, published_only=False
+        ).subquery()
+        rows: Any = (
+            select(models.Follow.follower_id, latest.c.id)
+            .join(latest, true())
+            .filter(models.Follow.followee_id == author_id)
+        )
+        await db.execute(
+            pg_insert(models.Timeline)
+            .from_select(["user_id", "post_id"], rows)
+            .on_conflict_do_nothing()
+        )
+
+
+async def remove(db: AsyncSession, user_id: int, followee_id: int) -> None:
+    """Drop the posts of an unfollowed user from a timeline."""
+    await db.execute(
+        delete(models.Timeline).filter(
+            models.Timeline.user_id == user_id,
+            models.Timeline.post_id.in_(
+                select(models.Posts.id).filter(models.Posts.owner_id == followee_id)
+            ),
+        )
+    )
+
+
+async def read(
+    db: AsyncSession, user_id: int, limit: int, before: Optional[int] = None
+) -> list[models.Posts]:
+    """A feed page: the posts of `user_id` and of the users it follows.
+
+    Args:
+        db (AsyncSession): session
+        user_id (int): the reader
+        limit (int): page size
+        before (int, optional): only posts with a lower id (keyset cursor)
+    Returns:
+        list[models.Posts]: newest first, owners loaded. Posts of others only
+        when published
+    """
+    # Followed authors fanned out on read: an index range scan of the users
+    # over the threshold, each probed in the reader's follows
+    read_authors: list[int] = list(
+        await db.scalars(
+            select(models.Follow.followee_id).filter(
+                models.Follow.follower_id == user_id,
+                models.Follow.followee_id.in_(
+                    select(models.User.id).filter(
+                        models.User.follower_count > settings.FEED_FANOUT_MAX_FOLLOWERS
+                    )
+                ),
+            )
+        )
+    )
+    timeline: Any = (
+        select(models.Timeline.post_id.label("id"))
+        .join(models.Posts, models.Posts.id == models.Timeline.post_id)
+        .filter(models.Timeline.user_id == user_id, models.Posts.published)
+    )
+    if before is not None:
+        timeline = timeline.filter(models.Timeline.post_id < before)
+    sources: list[Any] = [
+        timeline.order_by(models.Timeline.post_id.desc()).limit(limit),
+        _latest_posts(user_id, limit, before, published_only=False),
+        *(_latest_posts(author, limit, before) for author in read_authors),
+    ]
+    ids: Any = union_all(*(select(source.subquery().c.id) for source in sources))
+    return list(
+        await db.scalars(
+            select(models.Posts)
+            .options(joinedload(models.Posts.owner))
+            .filter(models.Posts.id.in_(ids))
+            .order_by(models.Posts.id.desc())
+            .limit(limit)
+        )
+    )
+
+
+def _latest_posts(
+    owner_id: int, limit: int, before: Optional[int], published_only: bool = True
+) -> Any:
+    query: Any = select(models.Posts.id).filter(models.Posts.owner_id == owner_id)
+    if published_only:
+        query = query.filter(models.Posts.published)
+    if before is not None:
+        query = query.filter(models.Posts.id < before)
+    return query.order_by(models.Posts.id.desc()).limit(limit)
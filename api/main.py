@@ -1,6 +1,8 @@
+import asyncio
 import os
 import sys
-from typing import Any
+from contextlib import asynccontextmanager, suppress
+from typing import Any, AsyncIterator, Optional
 
 # Add the project root to the Python path
 project_root: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -13,21 +15,22 @@ from fastapi import APIRouter, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from loguru import logger
 
-from api import routers
+from api import middleware, routers, utils, warmup
 
 # from app.config import settings, setup_app_logging
 from api.config import (
     API_PROJECT_NAME,
     API_V1_STR,
     __version__,
+    drain_app_logging,
     settings,
     setup_app_logging,
 )
 from api.db import models
-from api.db.database import engine
+from api.db.database import async_engine, engine, read_replicas
 
 # setup logging as early as possible
 setup_app_logging(config=settings)
@@ -36,11 +39,40 @@ setup_app_logging(config=settings)
 preFix: str = API_V1_STR
 api_project_name: str = API_PROJECT_NAME
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Startup/shutdown hooks."""
+    # Warm up in the background: the worker serves (and answers
+    # /health/ready with 503) while it runs
+    warmup_task: Optional[asyncio.Task] = None
+    if settings.WARMUP_ENABLED:
+        warmup_task = asyncio.create_task(warmup.run())
+    else:
+        warmup.state.ready = True
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await warmup_task
+    # Let in-flight password hashing finish before the worker exits
+    utils.shutdown_hash_executor()
+    # Close pooled connections instead of dropping them on exit
+    await async_engine.dispose()
+    for replica in read_replicas.replicas:
+        await replica.engine.dispose()
+    # Write out the queued log messages
+    drain_app_logging()
+
+
 app = FastAPI(
     title=f"{api_project_name}",
     openapi_url=f"{preFix}/openapi.json",
     swagger_ui_parameters={"syntaxHighlight.theme": "obsidian"},
     servers=settings.SERVERS,
+    lifespan=lifespan,
+    # orjson for every JSON response that isn't built by utils.responses
+    default_response_class=ORJSONResponse,
 )
 
 # models.Base.metadata.create_all(bind=engine)
@@ -72,7 +104,26 @@ app.include_router(routers.desc_router, prefix=preFix)
 app.include_router(routers.auth_router, prefix=preFix)
 app.include_router(routers.user_router, prefix=preFix)
 app.include_router(routers.post_router, prefix=preFix)
+app.include_router(routers.feed_router, prefix=preFix)
+app.include_router(routers.admin_router, prefix=preFix)
 app.include_router(root_router)
+app.include_router(routers.metrics_router)
+app.include_router(routers.health_router)
+
+# Count SQL statements per request (X-Query-Count with QUERY_COUNT_HEADER)
+app.add_middleware(middleware.QueryCountMiddleware)
+
+# Reads right after a client's write go to the primary (with read replicas)
+app.add_middleware(middleware.ReadYourWritesMiddleware)
+
+# On-demand profiling of a single request (superusers, X-Profile: 1)
+app.add_middleware(middleware.ProfilingMiddleware)
+
+# Prometheus metrics of every request, served by GET /metrics
+app.add_middleware(middleware.MetricsMiddleware)
+
+# Request IDs for every log record and a sampled access log (outermost)
+app.add_middleware(middleware.RequestLogMiddleware)
 
 # Set all CORS enabled origins
 if settings.BACKEND_CORS_ORIGINS:
@@ -82,6 +133,10 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[
+            utils.pagination.NEXT_CURSOR_HEADER,
+            middleware.REQUEST_ID_HEADER,
+        ],
     )
 
 # # Add TrustedHost middleware
@@ -0,0 +1,66 @@
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    multiprocess,
+)
+
+# Served by GET /metrics (routers.metrics). Values are per worker process
+# unless PROMETHEUS_MULTIPROC_DIR is set, then they are summed across workers.
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "Requests by route template and response status.",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Request latency, from the first byte received to the last byte sent.",
+    ["method", "route"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being served.",
+    multiprocess_mode="livesum",
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_request_duration_seconds",
+    "Time spent executing SQL statements per request.",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed per request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt hash/verify latency, including the wait for a hashing worker.",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+PASSWORD_HASH_IN_FLIGHT = Gauge(
+    "password_hash_in_flight",
+    "bcrypt jobs submitted to the hashing pool and not finished (queued + running).",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "bcrypt jobs waiting for a hashing worker.",
+    multiprocess_mode="livesum",
+)
+
+
+def get_registry() -> CollectorRegistry:
+    """Registry to expose: the default one, or all workers' in multiprocess mode."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
@@ -0,0 +1,5 @@
+from .metrics import MetricsMiddleware
+from .profiling import PROFILE_HEADER, ProfilingMiddleware
+from .query_count import QUERY_COUNT_HEADER, QueryCountMiddleware
+from .request_log import REQUEST_ID_HEADER, RequestLogMiddleware
+from .read_your_writes import ReadYourWritesMiddleware
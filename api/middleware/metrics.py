@@ -0,0 +1,49 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api import metrics
+from api.db.query_counter import count_queries
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Record latency, status, in-flight count and DB time of every request.
+
+    Requests are labelled with their route template (/api/v1/posts/id/{id}),
+    never the raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app: ASGIApp = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code: int = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start: float = time.perf_counter()
+        metrics.HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            with count_queries() as counter:
+                await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.HTTP_REQUESTS_IN_PROGRESS.dec()
+            # FastAPI stores the matched route in the (shared) scope
+            route: str = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            method: str = scope["method"]
+            metrics.HTTP_REQUEST_DURATION.labels(method, route).observe(
+                time.perf_counter() - start
+            )
+            metrics.HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            metrics.DB_TIME_PER_REQUEST.labels(method, route).observe(counter.seconds)
+            metrics.DB_QUERIES_PER_REQUEST.labels(method, route).observe(counter.count)
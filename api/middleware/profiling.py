@@ -0,0 +1,94 @@
+import threading
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api import oauth2, utils
+from api.config import settings
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "profile"
+
+
+class ProfilingMiddleware:
+    """Profile a single request on demand (superusers only).
+
+    A request with an `X-Profile: 1` header or `?profile=1` is run under a
+    StackSampler and answered with the collapsed stacks (text/plain, ready
+    for flamegraph.pl or speedscope) instead of its own response. Everything
+    else goes straight through: one header/query lookup per request.
+
+    Only tokens with the is_superuser claim are profiled, and the profile is
+    only returned if get_current_user also saw a superuser (request.state.user);
+    otherwise the request's own response is sent. settings.PROFILING_ENABLED
+    switches it off. The event loop thread is sampled, so requests running
+    concurrently in the same worker show up in the profile too.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app: ASGIApp = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not settings.PROFILING_ENABLED
+            or not _profile_requested(scope)
+            or not _superuser_token(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        messages: list[Message] = []
+
+        async def buffer(message: Message) -> None:
+            messages.append(message)
+
+        sampler = utils.profiling.StackSampler(
+            threading.get_ident(), settings.PROFILING_INTERVAL_SECONDS
+        )
+        sampler.start()
+        try:
+            await self.app(scope, receive, buffer)
+        finally:
+            sampler.stop()
+
+        # Set by oauth2.get_current_user
+        user: Optional[dict[str, Any]] = scope.get("state", {}).get("user")
+        if not user or not user["is_superuser"]:
+            for message in messages:
+                await send(message)
+            return
+        body: bytes = sampler.collapsed().encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-profile-samples", str(sum(sampler.samples.values())).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def _profile_requested(scope: Scope) -> bool:
+    flag: Optional[str] = Headers(scope=scope).get(PROFILE_HEADER) or QueryParams(
+        scope["query_string"]
+    ).get(PROFILE_QUERY_PARAM)
+    return flag not in (None, "", "0", "false")
+
+
+def _superuser_token(scope: Scope) -> bool:
+    authorization: str = Headers(scope=scope).get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        claims: Any = oauth2.verify_access_token(token, HTTPException(401))
+    except HTTPException:
+        return False
+    return bool(claims.is_superuser)
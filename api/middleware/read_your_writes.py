@@ -0,0 +1,39 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.config import settings
+from api.db import READ_PRIMARY_COOKIE, read_replicas
+
+READ_METHODS: frozenset[str] = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class ReadYourWritesMiddleware:
+    """Send the reads that follow a client's write to the primary.
+
+    When read replicas are configured, every successful (< 400) non-GET
+    response sets the read_primary cookie for DB_READ_YOUR_WRITES_SECONDS;
+    get_async_read_db skips the replicas while the client sends it back.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app: ASGIApp = app
+        self.cookie: str = (
+            f"{READ_PRIMARY_COOKIE}=1; Max-Age={settings.DB_READ_YOUR_WRITES_SECONDS}"
+            "; Path=/; HttpOnly; SameSite=Lax"
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] in READ_METHODS
+            or not read_replicas
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                MutableHeaders(scope=message).append("set-cookie", self.cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
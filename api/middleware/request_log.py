@@ -0,0 +1,66 @@
+import random
+import time
+import uuid
+
+from loguru import logger
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.config import settings
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Load balancer probes: /health/ready answers 503 by design while the worker
+# warms up (api.warmup), not a server error
+PROBE_PATH_PREFIX = "/health/"
+
+
+class RequestLogMiddleware:
+    """Tag every request with an ID and write a sampled access log.
+
+    The ID comes from the X-Request-ID request header or is generated, is
+    bound to every log record of the request (loguru contextualize) and is
+    returned in the X-Request-ID response header. Successful requests are
+    logged with probability LOGGING_ACCESS_SAMPLE_RATE; 4xx and 5xx always,
+    5xx at ERROR except for health probes.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app: ASGIApp = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id: str = (
+            Headers(scope=scope).get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        )
+        status_code: int = 500
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            await send(message)
+
+        start: float = time.perf_counter()
+        with logger.contextualize(request_id=request_id):
+            try:
+                await self.app(scope, receive, send_with_request_id)
+            finally:
+                if (
+                    status_code >= 400
+                    or random.random() < settings.logging.LOGGING_ACCESS_SAMPLE_RATE
+                ):
+                    probe: bool = scope["path"].startswith(PROBE_PATH_PREFIX)
+                    server_error: bool = status_code >= 500 and not probe
+                    # keyword arguments also end up in the record's extra
+                    logger.log(
+                        "ERROR" if server_error else "INFO",
+                        "{method} {path} {status} {duration_ms}ms",
+                        method=scope["method"],
+                        path=scope["path"],
+                        status=status_code,
+                        duration_ms=round((time.perf_counter() - start) * 1000, 2),
+                    )
@@ -1,15 +1,16 @@
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Any
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # import schemas
-from api import schemas
+from api import schemas, utils
 from api.config import API_V1_STR, settings
 from api.db import models
-from api.db.database import get_db
+from api.db.database import get_async_db
 
 # Move the first character to the end
 API_V1_STR: str = API_V1_STR[1:] + API_V1_STR[0]
@@ -23,6 +24,18 @@ ALGORITHM: str = settings.ALGORITHM
 # EXPIRATION TIME
 ACCESS_TOKEN_EXPIRE_MINUTES: int = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
+# Auth records of current users, invalidated by the user update/delete routes
+user_cache = utils.TTLCache(
+    maxsize=settings.AUTH_USER_CACHE_MAXSIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL_SECONDS,
+)
+
+# Verified claims by token digest, each entry expires no later than its token
+token_cache = utils.TTLCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_MAXSIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL_SECONDS,
+)
+
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode: dict = data.copy()
@@ -33,11 +46,20 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
             minutes=ACCESS_TOKEN_EXPIRE_MINUTES
         )
     to_encode.update({"exp": expire})
+    from jose import jwt  # imported on first use, off the startup path
+
     encoded_jwt: str = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def verify_access_token(token: str, credentials_exception) -> dict[str, Any]:
+    # Repeat requests with the same token skip the signature check and model
+    key: bytes = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    token_data: Any = token_cache.get(key)
+    if token_data is not None:
+        return token_data
+    from jose import JWTError, jwt  # imported on first use, off the startup path
+
     try:
         payload: dict[str, Any] = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         id: int = payload.get("user_id")
@@ -59,26 +81,67 @@ def verify_access_token(token: str, credentials_exception) -> dict[str, Any]:
         raise credentials_exception
 
     # print("Token Data: ", token_data)
+    # Never outlive the token (exp is required by create_access_token)
+    expires_in: float = payload.get("exp", 0) - time.time()
+    if expires_in > 0:
+        token_cache.set(key, token_data, ttl=min(token_cache.ttl, expires_in))
     return token_data
 
 
+async def get_token_data(token: str = Depends(oauth2_scheme)) -> schemas.TokenData:
+    """Claims of the bearer token, decoded once per request.
+
+    Raises:
+        HTTPException: 401 Unauthorized for a missing or invalid token.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=f"Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    return verify_access_token(token, credentials_exception)
+
+
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-)-> dict[str, Any]:
+    request: Request,
+    token: schemas.TokenData = Depends(get_token_data),
+    db: AsyncSession = Depends(get_async_db),
+) -> dict[str, Any]:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail=f"Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    token = verify_access_token(token, credentials_exception)
     # print("Token: ", token)
-    user: Any = db.query(models.User).filter(models.User.id == token.id).first()
-    user = {
-        "id": user.id,
-        "username": user.username,
-        "is_active": user.is_active,
-        "is_superuser": user.is_superuser,
-    }
+    if settings.AUTH_CLAIMS_ONLY:
+        request.state.user = token.model_dump()
+        return dict(request.state.user)
+
+    user: Any = user_cache.get(token.id)
+    if user is None:
+        db_user: Any = await db.get(models.User, token.id)
+        if db_user is None:
+            raise credentials_exception
+        user = {
+            "id": db_user.id,
+            "username": db_user.username,
+            "is_active": db_user.is_active,
+            "is_superuser": db_user.is_superuser,
+        }
+        user_cache.set(token.id, user)
     # print("User: ", user)
-    return user
+    # For middleware that runs after the route (e.g. ProfilingMiddleware)
+    request.state.user = user
+    return dict(user)
+
+
+async def get_current_superuser(
+    current_user: dict[str, Any] = Depends(get_current_user)
+) -> dict[str, Any]:
+    if not current_user["is_superuser"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Superuser privileges required",
+        )
+    return current_user
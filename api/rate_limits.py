@@ -0,0 +1,76 @@
+import math
+from typing import Any, Callable, Coroutine, Hashable
+
+from fastapi import Depends, HTTPException, Request, status
+
+from api import oauth2, schemas, utils
+from api.config import settings
+
+# Per worker: with N workers a client gets up to N times the configured rate
+login_limiter = utils.RateLimiter(
+    settings.RATE_LIMIT_LOGIN_PER_MINUTE, maxsize=settings.RATE_LIMIT_MAXSIZE
+)
+signup_limiter = utils.RateLimiter(
+    settings.RATE_LIMIT_SIGNUP_PER_MINUTE, maxsize=settings.RATE_LIMIT_MAXSIZE
+)
+user_writes_limiter = utils.RateLimiter(
+    settings.RATE_LIMIT_USER_WRITES_PER_MINUTE, maxsize=settings.RATE_LIMIT_MAXSIZE
+)
+LIMITERS: dict[str, utils.RateLimiter] = {
+    "login": login_limiter,
+    "signup": signup_limiter,
+    "user_writes": user_writes_limiter,
+}
+
+
+def _check(limiter: utils.RateLimiter, key: Hashable) -> None:
+    """Take a token for `key`.
+
+    Raises:
+        HTTPException: 429 Too Many Requests, with Retry-After in seconds
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    retry_after: float = limiter.acquire(key)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+def by_client_ip(
+    limiter: utils.RateLimiter,
+) -> Callable[[Request], Coroutine[Any, Any, None]]:
+    """Route dependency limiting requests per client IP.
+
+    The client IP is the X-Forwarded-For one from the proxies trusted by
+    FORWARDED_ALLOW_IPS (gunicorn.conf.py trusts any by default, uvicorn
+    only 127.0.0.1).
+    """
+
+    async def limit(request: Request) -> None:
+        _check(limiter, request.client.host if request.client else None)
+
+    return limit
+
+
+def by_user(
+    limiter: utils.RateLimiter,
+) -> Callable[..., Coroutine[Any, Any, None]]:
+    """Route dependency limiting requests per JWT user_id.
+
+    Only decodes the token (shared with get_current_user), no DB lookup.
+    """
+
+    async def limit(token: schemas.TokenData = Depends(oauth2.get_token_data)) -> None:
+        _check(limiter, token.id)
+
+    return limit
+
+
+# Route dependencies, e.g. @router.post(..., dependencies=[Depends(limit_login)])
+limit_login = by_client_ip(login_limiter)
+limit_signup = by_client_ip(signup_limiter)
+limit_user_writes = by_user(user_writes_limiter)
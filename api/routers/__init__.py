@@ -1,6 +1,10 @@
 from .post import preFix_post
 from .user import preFix_user
+from .admin import admin_router
 from .auth import auth_router
 from .desc import desc_router
+from .feed import feed_router
+from .health import health_router
+from .metrics import metrics_router
 from .post import post_router
-from .user import user_router
\ No newline at end of file
+from .user import user_router
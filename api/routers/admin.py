@@ -0,0 +1,87 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, status
+
+from api import oauth2, schemas
+from api.db import pool_status, read_replicas
+from api.db.database import async_engine, engine
+
+from .post import post_cache
+
+# Prefix for all "Admin" endpoints
+preFix_admin = "/admin"
+
+admin_router = APIRouter(prefix=preFix_admin, tags=["Admin"])
+
+
+# GET DATABASE CONNECTION POOL STATUS
+@admin_router.get(
+    "/db/pool",
+    response_model=dict[str, schemas.PoolStatus],
+    status_code=status.HTTP_200_OK,
+)
+async def get_db_pool(
+    current_user: dict[str, Any] = Depends(oauth2.get_current_superuser),
+) -> dict[str, schemas.PoolStatus]:
+    """Connection pool telemetry of this worker process (superusers only).
+    Args:
+        current_user (dict[str, Any]): Current superuser.
+    Raises:
+        HTTPException: 403 Forbidden if the user is not a superuser.
+    Returns:
+        dict[str, schemas.PoolStatus]: "async" (API routes) and "sync" pools,
+            and "replica <name>" per read replica.
+    """
+    return {
+        "async": pool_status(async_engine.pool),
+        "sync": pool_status(engine.pool),
+        **{
+            f"replica {replica.name}": pool_status(replica.engine.pool)
+            for replica in read_replicas.replicas
+        },
+    }
+
+
+# GET READ REPLICA STATUS
+@admin_router.get(
+    "/db/replicas",
+    response_model=list[schemas.ReplicaStatus],
+    status_code=status.HTTP_200_OK,
+)
+async def get_db_replicas(
+    current_user: dict[str, Any] = Depends(oauth2.get_current_superuser),
+) -> list[dict[str, Any]]:
+    """Lag and health of the read replicas, as last checked by this worker
+    (superusers only).
+    Args:
+        current_user (dict[str, Any]): Current superuser.
+    Raises:
+        HTTPException: 403 Forbidden if the user is not a superuser.
+    Returns:
+        list[schemas.ReplicaStatus]: Empty without DB_REPLICA_HOSTNAMES.
+    """
+    return [replica.status() for replica in read_replicas.replicas]
+
+
+# GET IN-PROCESS CACHE STATS
+@admin_router.get(
+    "/cache",
+    response_model=dict[str, schemas.CacheStats],
+    status_code=status.HTTP_200_OK,
+)
+async def get_cache_stats(
+    current_user: dict[str, Any] = Depends(oauth2.get_current_superuser),
+) -> dict[str, schemas.CacheStats]:
+    """Size and hit/miss counters of this worker's caches (superusers only).
+    Args:
+        current_user (dict[str, Any]): Current superuser.
+    Raises:
+        HTTPException: 403 Forbidden if the user is not a superuser.
+    Returns:
+        dict[str, schemas.CacheStats]: "auth_tokens", "auth_users" and "posts".
+    """
+    return {
+        "auth_tokens": oauth2.token_cache.stats(),
+        "auth_users": oauth2.user_cache.stats(),
+        "posts": post_cache.stats(),
+    }
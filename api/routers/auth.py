@@ -3,38 +3,43 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # import schemas
-from api import oauth2, schemas
+from api import oauth2, rate_limits, schemas
 from api.db import models
-from api.db.database import get_db
+from api.db.database import get_async_db
 from api import utils
 
 auth_router = APIRouter(tags=["Auth"])
 
 
-@auth_router.post("/login", response_model=schemas.Token)
+@auth_router.post(
+    "/login",
+    response_model=schemas.Token,
+    # Per client IP, before the form is checked against bcrypt
+    dependencies=[Depends(rate_limits.limit_login)],
+)
 async def login(
     user_credentials: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> dict[str, str]:
     """Login Route: Generates access token for user.
     Args:
         user_credentials (OAuth2PasswordRequestForm): User login data.
-        db (Session): Database session.
+        db (AsyncSession): Database session.
     Raises:
         HTTPException: 403 Forbidden for invalid credentials.
+        HTTPException: 429 Too Many Requests past RATE_LIMIT_LOGIN_PER_MINUTE.
     Returns:
         dict: Access token and type.
     """
 
-    user: Any = (
-        db.query(models.User)
-        .filter(
+    user: Any = await db.scalar(
+        select(models.User).filter(
             models.User.email == user_credentials.username
         )  # username is email because of SWAGGER UI bug in OAuth2PasswordRequestForm
-        .first()
     )
 
     if not user:
@@ -42,7 +47,7 @@ async def login(
             status_code=status.HTTP_403_FORBIDDEN, detail=f"Invalid Credentials"
         )
 
-    if not utils.verify_password(user_credentials.password, user.password):
+    if not await utils.verify_password_async(user_credentials.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail=f"Invalid Credentials"
         )
@@ -22,5 +22,5 @@ def description() -> schemas.Desc:
         api_version=__version__,
         package_version=package_version,
     )
-    logger.info(f"API Description: {desc}")
+    logger.debug(f"API Description: {desc}")
     return desc
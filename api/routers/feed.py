@@ -0,0 +1,49 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api import oauth2, schemas, utils
+from api.db import timeline
+from api.db.database import get_async_read_db
+
+from .post import posts_adapter
+
+feed_router = APIRouter(tags=["Feed"])
+
+
+# GET THE HOME FEED
+@feed_router.get(
+    "/feed",
+    response_model=list[schemas.ResponseBase],
+    status_code=status.HTTP_200_OK,
+)
+async def get_feed(
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: dict = Depends(oauth2.get_current_user),
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Response:
+    """GET THE HOME FEED
+    Own posts and the published posts of followed users, newest first, from
+    the precomputed timeline (see api.db.timeline). A page costs the same
+    however many users are followed.
+    Args:
+        db: Depends(get_async_read_db), a replica when one is usable
+        current_user (dict): Depends(oauth2.get_current_user)
+        limit (int): Defaults to 20 (max PAGINATION_MAX_LIMIT)
+        cursor (Optional[str]): X-Next-Cursor of the previous page
+    Raises:
+        HTTPException: 400 Bad Request for a malformed cursor
+    Returns:
+        list[schemas.ResponseBase], X-Next-Cursor header when there is a next page
+    """
+    posts: Any = await timeline.read(
+        db,
+        current_user["id"],
+        utils.pagination.page_size(limit),
+        before=utils.pagination.decode_cursor(cursor) if cursor else None,
+    )
+    response: Response = utils.responses.model_response(posts_adapter, posts)
+    utils.pagination.set_next_cursor(response, posts, limit)
+    return response
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Response, status
+
+from api import schemas, warmup
+
+health_router = APIRouter(prefix="/health", tags=["Health"])
+
+
+# LIVENESS
+@health_router.get("/live", status_code=status.HTTP_200_OK)
+def live() -> dict[str, str]:
+    """The worker is up and serving requests (it may still be warming up).
+
+    Returns:
+        dict: {"status": "ok"}
+    """
+    return {"status": "ok"}
+
+
+# READINESS
+@health_router.get(
+    "/ready",
+    response_model=schemas.Readiness,
+    responses={status.HTTP_503_SERVICE_UNAVAILABLE: {"model": schemas.Readiness}},
+)
+def ready(response: Response) -> schemas.Readiness:
+    """Whether the startup warmup (api.warmup) of this worker is done.
+
+    Point the load balancer health check here: a new worker gets traffic
+    once its database connections are open and bcrypt and jose are loaded.
+
+    Returns:
+        schemas.Readiness: 200 when ready, else 503
+    """
+    if not warmup.state.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return schemas.Readiness(**warmup.state.status())
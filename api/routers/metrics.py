@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from api import metrics
+
+metrics_router = APIRouter(tags=["Metrics"])
+
+
+# PROMETHEUS METRICS
+@metrics_router.get("/metrics", include_in_schema=False)
+def get_metrics() -> Response:
+    """Prometheus text exposition of api.metrics.
+
+    Returns:
+        Response: text/plain; version=0.0.4
+    """
+    return Response(
+        content=generate_latest(metrics.get_registry()),
+        media_type=CONTENT_TYPE_LATEST,
+    )
@@ -1,18 +1,40 @@
-from typing import Any, Optional
+import json
+from typing import Any, AsyncIterator, NamedTuple, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import aliased, contains_eager, joinedload
 
 # import oauth2
-from api import oauth2, schemas
-from api.db import models
-from api.db.database import get_db
+from api import oauth2, rate_limits, schemas, utils
+from api.config import settings
+from api.db import models, timeline
+from api.db.database import get_async_db, get_async_read_db, get_async_sessionmaker
 
 preFix_post = "/posts"
 
 post_router = APIRouter(prefix=preFix_post, tags=["Posts"])
 
 
+class CachedPost(NamedTuple):
+    owner_id: int
+    etag: str
+    body: bytes  # schemas.ResponseBase as JSON
+
+
+# Serialized posts by id, plus the id of the latest post under LATEST_POST_KEY.
+# Invalidated by the create/update/delete routes, only filled from the primary
+post_cache = utils.TTLCache(
+    maxsize=settings.POST_CACHE_MAXSIZE, ttl=settings.POST_CACHE_TTL_SECONDS
+)
+LATEST_POST_KEY: str = "latest"
+
+posts_adapter = TypeAdapter(list[schemas.ResponseBase])
+
+
 # GET ALL POSTS
 @post_router.get(
     "/get",
@@ -20,46 +42,80 @@ post_router = APIRouter(prefix=preFix_post, tags=["Posts"])
     status_code=status.HTTP_200_OK,
 )
 async def get_posts(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: dict = Depends(oauth2.get_current_user),
     limit: int = 100,
     skip: int = 0,
+    cursor: Optional[str] = None,
     search: Optional[str] = "",
-) -> list[schemas.ResponseBase]:
+    search_mode: utils.search.SearchMode = "substring",
+) -> Response:
     """GET ALL POSTS
     Args:
-        db: Depends(get_db)
+        db: Depends(get_async_read_db), a replica when one is usable
         current_user (dict): Depends(oauth2.get_current_user)
-        limit, skip (int): Defaults to 100 & 0
+        limit, skip (int): Defaults to 100 (max PAGINATION_MAX_LIMIT) & 0
+        cursor (Optional[str]): X-Next-Cursor of the previous page, replaces skip
         search (Optional[str], optional): Search str in title col. Defaults to ""
+        search_mode (str): "substring" (by id) or "fuzzy" (by relevance)
     Returns:
-        list[schemas.ResponseBase]
+        list[schemas.ResponseBase], X-Next-Cursor header when there is a next page
     """
     # print("Current User: ", current_user["id"])
-    if current_user["is_superuser"]:
-        all_posts: Any = (
-            db.query(models.Posts)
-            .filter(models.Posts.title.contains(search))
-            .limit(limit)
-            .offset(skip)
-            .all()
-        )
-        return all_posts
-    else:
-        all_posts = (
-            db.query(models.Posts)
-            .filter(models.Posts.owner_id == current_user["id"])
-            .filter(models.Posts.title.contains(search))
-            .limit(limit)
-            .offset(skip)
-            .all()
+    query: Any = select(models.Posts).options(joinedload(models.Posts.owner))
+    fuzzy: bool = bool(search) and search_mode == "fuzzy"
+    if fuzzy:
+        query = utils.search.fuzzy_search(query, models.Posts.title, search, cursor)
+    elif search:
+        query = query.filter(models.Posts.title.contains(search))
+    if not current_user["is_superuser"]:
+        query = query.filter(models.Posts.owner_id == current_user["id"])
+    query = utils.pagination.paginate(query, models.Posts.id, limit, skip, cursor)
+    all_posts: Any = (await db.scalars(query)).all()
+    if len(all_posts) == 0 and not current_user["is_superuser"] and not cursor:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No posts found for user with owner_id={current_user['id']} or user is not a superuser",
         )
-        if len(all_posts) == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"No posts found for user with owner_id={current_user['id']} or user is not a superuser",
-            )
-        return all_posts
+    response: Response = utils.responses.model_response(posts_adapter, all_posts)
+    if not fuzzy:
+        utils.pagination.set_next_cursor(response, all_posts, limit)
+    return response
+
+
+# EXPORT ALL POSTS
+@post_router.get(
+    "/export",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def export_posts(
+    session_factory: async_sessionmaker = Depends(get_async_sessionmaker),
+    current_user: dict = Depends(oauth2.get_current_superuser),
+    format: utils.export.ExportFormat = "ndjson",
+) -> StreamingResponse:
+    """EXPORT ALL POSTS (superusers only)
+    Args:
+        session_factory: Depends(get_async_sessionmaker), the stream's session
+        current_user (dict): Depends(oauth2.get_current_superuser)
+        format (str): "ndjson" (one post per line) or "csv"
+    Raises:
+        HTTPException: 403 Forbidden if the user is not a superuser
+    Returns:
+        StreamingResponse: posts.ndjson / posts.csv, ordered by id
+    """
+    query: Any = select(
+        models.Posts.id,
+        models.Posts.title,
+        models.Posts.content,
+        models.Posts.published,
+        models.Posts.post_created_at,
+        models.Posts.ratings,
+        models.Posts.owner_id,
+    ).order_by(models.Posts.id)
+    return utils.export.export_response(
+        session_factory, query, format, "posts", settings.EXPORT_BATCH_SIZE
+    )
 
 
 # CREATE A POST
@@ -67,16 +123,17 @@ async def get_posts(
     "/create",
     response_model=schemas.ResponseBase,
     status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limits.limit_user_writes)],
 )
 async def create_post(
     post: schemas.CreatePost,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(oauth2.get_current_user),
 ) -> schemas.ResponseBase:
     """CREATE A POST
     Args:
         post: schemas.CreatePost
-        db: Session, Defaults to Depends(get_db)
+        db: AsyncSession, Defaults to Depends(get_async_db)
         current_user (dict): Depends(oauth2.get_current_user)
     Raises:
         HTTPException: 422 Unprocessable Entity
@@ -94,6 +151,8 @@ async def create_post(
         content=post.content,
         published=post.published,
         owner_id=int(current_user["id"]),
+        # Loaded up front so serializing the response needs no lazy load
+        owner=await db.get(models.User, int(current_user["id"])),
     )
     if not new_post:
         raise HTTPException(
@@ -102,40 +161,196 @@ async def create_post(
         )
     # Add the new post to the session
     db.add(new_post)
-    # Commit the changes to the database
-    db.commit()
-    # Refresh the object to get the updated values from the database
-    db.refresh(new_post)
+    # INSERT now for the id (post_created_at comes back from INSERT ...
+    # RETURNING as well, see Posts.__mapper_args__)
+    await db.flush()
+    # Into the followers' home timelines (GET /feed), same transaction
+    await timeline.fan_out(db, new_post.owner, [new_post.id])
+    await db.commit()
+    post_cache.pop(LATEST_POST_KEY)
     return new_post
 
 
+# CREATE POSTS IN BULK
+@post_router.post(
+    "/bulk",
+    response_model=schemas.BulkPostsResult,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limits.limit_user_writes)],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/CreatePost"},
+                    }
+                },
+                utils.ndjson.NDJSON_MEDIA_TYPE: {
+                    "schema": {"$ref": "#/components/schemas/CreatePost"}
+                },
+            },
+        }
+    },
+)
+async def create_posts_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(oauth2.get_current_user),
+) -> schemas.BulkPostsResult:
+    """CREATE POSTS IN BULK
+    Body is a JSON array of CreatePost items, or one CreatePost per line with
+    Content-Type: application/x-ndjson (read as it streams in). Valid items are
+    inserted POST_BULK_BATCH_SIZE rows at a time, each batch one multi-row
+    INSERT ... RETURNING, and committed together; invalid items are skipped and
+    reported by their index.
+    Args:
+        request (Request): JSON array or NDJSON body
+        db: AsyncSession, Defaults to Depends(get_async_db)
+        current_user (dict): Depends(oauth2.get_current_user)
+    Raises:
+        HTTPException: 400 Bad Request for a body that is not a JSON array
+        HTTPException: 413 Request Entity Too Large over POST_BULK_MAX_ITEMS,
+            a JSON array over POST_BULK_MAX_BYTES or an NDJSON line over
+            POST_BULK_MAX_LINE_BYTES
+        HTTPException: 422 Unprocessable Entity if no item is valid
+    Returns:
+        schemas.BulkPostsResult: created posts and per-item errors
+    """
+    items: AsyncIterator[Any]
+    validate: Any
+    if request.headers.get("content-type", "").startswith(
+        utils.ndjson.NDJSON_MEDIA_TYPE
+    ):
+        items = utils.ndjson.iter_lines(
+            request.stream(), settings.POST_BULK_MAX_LINE_BYTES
+        )
+        validate = schemas.CreatePost.model_validate_json
+    else:
+        try:
+            body: Any = json.loads(
+                await _read_body(request, settings.POST_BULK_MAX_BYTES)
+            )
+        except json.JSONDecodeError:
+            body = None
+        if not isinstance(body, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Expected a JSON array of posts or {utils.ndjson.NDJSON_MEDIA_TYPE}",
+            )
+        items = _aiter(body)
+        validate = schemas.CreatePost.model_validate
+
+    result = schemas.BulkPostsResult(created=[], errors=[])
+    batch: list[dict[str, Any]] = []
+    index: int = 0
+    async for item in items:
+        if index >= settings.POST_BULK_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {settings.POST_BULK_MAX_ITEMS} posts per request",
+            )
+        try:
+            post: schemas.CreatePost = validate(item)
+        except ValidationError as e:
+            result.errors.append(
+                schemas.BulkItemError(
+                    index=index,
+                    errors=e.errors(
+                        include_url=False, include_context=False, include_input=False
+                    ),
+                )
+            )
+        else:
+            batch.append({**post.model_dump(), "owner_id": int(current_user["id"])})
+            if len(batch) >= settings.POST_BULK_BATCH_SIZE:
+                result.created += await _insert_posts(db, batch)
+                batch = []
+        index += 1
+    if batch:
+        result.created += await _insert_posts(db, batch)
+
+    if not result.created:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[error.model_dump() for error in result.errors] or "No posts given",
+        )
+    await timeline.fan_out(
+        db,
+        await db.get(models.User, int(current_user["id"])),
+        [post.id for post in result.created],
+    )
+    await db.commit()
+    post_cache.pop(LATEST_POST_KEY)
+    return result
+
+
+async def _read_body(request: Request, max_bytes: int) -> bytes:
+    """The request body, refused with 413 past `max_bytes` before it is
+    read (by Content-Length) or as soon as it streams past them."""
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Bodies of at most {max_bytes} bytes",
+    )
+    length: str = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes:
+        raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise too_large
+    return bytes(body)
+
+
+async def _aiter(items: list[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+async def _insert_posts(
+    db: AsyncSession, rows: list[dict[str, Any]]
+) -> list[schemas.PostCreated]:
+    """One multi-row INSERT ... RETURNING for `rows`."""
+    posts: Any = await db.scalars(insert(models.Posts).returning(models.Posts), rows)
+    return [schemas.PostCreated.model_validate(post) for post in posts]
+
+
 # GET A POST BY ID
 @post_router.get(
-    "/id/{id}", response_model=schemas.ResponseBase, status_code=status.HTTP_200_OK
+    "/id/{id}",
+    response_model=schemas.ResponseBase,
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"}},
 )
 async def get_post_by_id(
     id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: dict = Depends(oauth2.get_current_user),
-) -> schemas.ResponseBase:
+) -> Response:
     """GET A POST BY ID
+    Served from post_cache when possible; answers 304 Not Modified when the
+    If-None-Match header matches the post's ETag.
     Args:
         id (int): id
-        db: Session, Defaults to Depends(get_db)
+        request (Request): If-None-Match header
+        db: AsyncSession, Defaults to Depends(get_async_read_db)
         current_user (dict): Depends(oauth2.get_current_user)
     Raises:
         HTTPException: 404 Not Found
     Returns:
-        schemas.ResponseBase
+        schemas.ResponseBase (with an ETag header)
     """
-    post: Any = db.query(models.Posts).filter(models.Posts.id == id).first()
+    post: Optional[CachedPost] = await _get_cached_post(db, id)
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Post with id={id} not found or current user is not the owner of the post with id={id}",
         )
     if post.owner_id == current_user["id"] or current_user["is_superuser"]:
-        return post
+        return _cached_post_response(request, post)
     else:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -145,28 +360,47 @@ async def get_post_by_id(
 
 # GET LATEST POST
 @post_router.get(
-    "/latest", response_model=schemas.ResponseBase, status_code=status.HTTP_200_OK
+    "/latest",
+    response_model=schemas.ResponseBase,
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"}},
 )
 async def get_post_latest(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: dict = Depends(oauth2.get_current_user),
-) -> schemas.ResponseBase:
+) -> Response:
     """GET LATEST POST
+    Cached and conditional like GET /posts/id/{id}.
     Args:
-        db: Session, Depends(get_db)
+        request (Request): If-None-Match header
+        db: AsyncSession, Depends(get_async_read_db)
         current_user (dict): Depends(oauth2.get_current_user)
     Raises:
         HTTPException: 404 Not Found.
     Returns:
-        schemas.ResponseBase
+        schemas.ResponseBase (with an ETag header)
     """
-    latest_post: Any = db.query(models.Posts).order_by(models.Posts.id.desc()).first()
-    if not latest_post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="No post found"
+    latest_id: Optional[int] = post_cache.get(LATEST_POST_KEY)
+    latest_post: Optional[CachedPost] = (
+        await _get_cached_post(db, latest_id) if latest_id is not None else None
+    )
+    if latest_post is None:
+        post: Any = await db.scalar(
+            select(models.Posts)
+            .options(joinedload(models.Posts.owner))
+            .order_by(models.Posts.id.desc())
+            .limit(1)
         )
+        if not post:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="No post found"
+            )
+        latest_post = _cache_post(db, post)
+        if _can_cache(db):
+            post_cache.set(LATEST_POST_KEY, post.id)
     if latest_post.owner_id == current_user["id"] or current_user["is_superuser"]:
-        return latest_post
+        return _cached_post_response(request, latest_post)
     else:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -174,43 +408,150 @@ async def get_post_latest(
         )
 
 
+async def _get_cached_post(db: AsyncSession, id: int) -> Optional[CachedPost]:
+    """Post `id` from post_cache, loaded (and cached) on a miss."""
+    cached: Optional[CachedPost] = post_cache.get(id)
+    if cached is None:
+        post: Any = await db.scalar(
+            select(models.Posts)
+            .options(joinedload(models.Posts.owner))
+            .filter(models.Posts.id == id)
+        )
+        if post is None:
+            return None
+        cached = _cache_post(db, post)
+    return cached
+
+
+def _can_cache(db: AsyncSession) -> bool:
+    """Whether what `db` loaded may go in post_cache.
+
+    Not when `db` is a replica: it can serve a post from before an update
+    the cache was invalidated for, which would then be served from the cache
+    to every client, the writer's read-your-writes reads included.
+    """
+    return "replica" not in db.info
+
+
+def _cache_post(db: AsyncSession, post: models.Posts) -> CachedPost:
+    body: bytes = (
+        schemas.ResponseBase.model_validate(post, from_attributes=True)
+        .model_dump_json()
+        .encode()
+    )
+    cached = CachedPost(post.owner_id, utils.etag.make_etag(body), body)
+    if _can_cache(db):
+        post_cache.set(post.id, cached)
+    return cached
+
+
+def _cached_post_response(request: Request, post: CachedPost) -> Response:
+    if utils.etag.etag_matches(request.headers.get("if-none-match"), post.etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": post.etag}
+        )
+    return Response(
+        content=post.body, media_type="application/json", headers={"ETag": post.etag}
+    )
+
+
 # DELETE A POST BY ID
 @post_router.delete(
     "/delete/{id}",
     status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(rate_limits.limit_user_writes)],
 )
 async def delete_post_by_id(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(oauth2.get_current_user),
 ):
     """DELETE A POST BY ID
     Args:
         id (int): id
-        db: Session, Depends(get_db).
+        db: AsyncSession, Depends(get_async_db).
         current_user (dict): Depends(oauth2.get_current_user).
     Raises:
         HTTPException: 404 Not Found.
+        HTTPException: 403 Forbidden if not the owner or a superuser.
     Returns:
         Status: 204 No Content.
     """
-    post_query: Any = db.query(models.Posts).filter(models.Posts.id == id)
+    # One statement, ownership is part of the WHERE clause (no check/delete race)
+    query: Any = delete(models.Posts).filter(models.Posts.id == id)
+    if not current_user["is_superuser"]:
+        query = query.filter(models.Posts.owner_id == current_user["id"])
+    deleted_id: Optional[int] = await db.scalar(query.returning(models.Posts.id))
 
-    post: Any = post_query.first()
+    if deleted_id is None:
+        # Nothing deleted: tell a missing post from someone else's post
+        await _raise_post_not_found_or_forbidden(db, id, current_user)
+    await db.commit()
+    post_cache.pop(id)
+    post_cache.pop(LATEST_POST_KEY)
+    return HTTPException(status_code=status.HTTP_204_NO_CONTENT)
 
-    if post is None:
+
+# DELETE POSTS IN BULK
+@post_router.delete(
+    "/bulk",
+    response_model=schemas.DeletedPosts,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(rate_limits.limit_user_writes)],
+)
+async def delete_posts_bulk(
+    posts: schemas.DeletePosts,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(oauth2.get_current_user),
+) -> schemas.DeletedPosts:
+    """DELETE POSTS IN BULK
+    One DELETE ... RETURNING for all ids; superusers may delete any post,
+    everyone else only their own.
+    Args:
+        posts: schemas.DeletePosts, the ids to delete
+        db: AsyncSession, Depends(get_async_db).
+        current_user (dict): Depends(oauth2.get_current_user).
+    Raises:
+        HTTPException: 413 Request Entity Too Large over POST_BULK_MAX_ITEMS.
+    Returns:
+        schemas.DeletedPosts: deleted ids, and the ids that were not found or
+        not owned by the user
+    """
+    if len(posts.ids) > settings.POST_BULK_MAX_ITEMS:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Post with id={id} not found"
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.POST_BULK_MAX_ITEMS} posts per request",
         )
-    if post.owner_id == current_user["id"] or current_user["is_superuser"]:
-        post_query.delete(synchronize_session=False)
-        db.commit()
-        return HTTPException(status_code=status.HTTP_204_NO_CONTENT)
-    else:
+    query: Any = delete(models.Posts).filter(models.Posts.id.in_(posts.ids))
+    if not current_user["is_superuser"]:
+        query = query.filter(models.Posts.owner_id == current_user["id"])
+    deleted: list[int] = sorted(
+        (await db.scalars(query.returning(models.Posts.id))).all()
+    )
+    await db.commit()
+    for id in deleted:
+        post_cache.pop(id)
+    post_cache.pop(LATEST_POST_KEY)
+    return schemas.DeletedPosts(
+        deleted=deleted, not_deleted=sorted(set(posts.ids).difference(deleted))
+    )
+
+
+async def _raise_post_not_found_or_forbidden(
+    db: AsyncSession, id: int, current_user: dict
+) -> None:
+    """404 if post `id` doesn't exist, else 403 (it isn't the user's)."""
+    owner_id: Optional[int] = await db.scalar(
+        select(models.Posts.owner_id).filter(models.Posts.id == id)
+    )
+    if owner_id is None:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Either Post with id={id} is not owned by user with owner_id={current_user['id']} or user is not a superuser",
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Post with id={id} not found"
         )
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=f"Either Post with id={id} is not owned by user with owner_id={current_user['id']} or user is not a superuser",
+    )
 
 
 # UPDATE A POST BY ID (USING PUT METHOD -> REPLACE THE ALL ENTRIES)
@@ -218,47 +559,46 @@ async def delete_post_by_id(
     "/update/{id}",
     response_model=schemas.ResponseBase,
     status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(rate_limits.limit_user_writes)],
 )
 async def update_post_by_id(
     id: int,
     updated_post: schemas.UpdatePost,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(oauth2.get_current_user),
 ) -> schemas.ResponseBase:
     """UPDATE A POST BY ID (PUT METHOD)
     Args:
         id (int): id
         updated_post: schemas.UpdatePost
-        db: Session,Depends(get_db).
+        db: AsyncSession, Depends(get_async_db).
         current_user (dict): Depends(oauth2.get_current_user).
     Raises:
         HTTPException: 404 Not Found.
+        HTTPException: 403 Forbidden if not the owner or a superuser.
     Returns:
         schemas.ResponseBase
     """
-    post: Any = db.query(models.Posts).filter(models.Posts.id == id).first()
+    # One statement: UPDATE ... RETURNING in a CTE, joined to the owner for the
+    # response. Ownership is part of the WHERE clause
+    query: Any = (
+        update(models.Posts)
+        .filter(models.Posts.id == id)
+        .values(**updated_post.model_dump(exclude_unset=True))
+    )
+    if not current_user["is_superuser"]:
+        query = query.filter(models.Posts.owner_id == current_user["id"])
+    updated: Any = query.returning(*models.Posts.__table__.c).cte("updated_post")
+    updated_posts: Any = aliased(models.Posts, updated)
+    post: Any = await db.scalar(
+        select(updated_posts)
+        .join(updated_posts.owner)
+        .options(contains_eager(updated_posts.owner))
+    )
 
     if post is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"Post with id={id} not found"
-        )
-
-    if post.owner_id == current_user["id"] or current_user["is_superuser"]:
-        # # Convert Pydantic model to a dictionary using jsonable_encoder
-        # updated_post_data = jsonable_encoder(updated_post)
-        # # Update the post with the new values
-        # for field, value in updated_post_data.items():
-        #     setattr(post, field, value)
-        # Update the post with the new values
-        for field in updated_post.model_dump(exclude_unset=True):
-            setattr(post, field, getattr(updated_post, field))
-        # Commit the changes to the database
-        db.commit()
-        # Refresh the object to get the updated values from the database
-        db.refresh(post)
-        return post
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Either Post with id={id} is not owned by user with owner_id={current_user['id']} or user is not a superuser",
-        )
+        # Nothing updated: tell a missing post from someone else's post
+        await _raise_post_not_found_or_forbidden(db, id, current_user)
+    await db.commit()
+    post_cache.pop(id)
+    return post
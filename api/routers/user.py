@@ -1,68 +1,77 @@
 from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Path, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Path, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 # import oauth2
-from api import oauth2, schemas, utils
-from api.db import models
-from api.db.database import get_db
+from api import oauth2, rate_limits, schemas, utils
+from api.config import settings
+from api.db import models, timeline
+from api.db.database import get_async_db, get_async_read_db, get_async_sessionmaker
+
+from .post import LATEST_POST_KEY, CachedPost, post_cache
 
 # Prefix for all "Users" endpoints
 preFix_user = "/users"
 
 user_router = APIRouter(prefix=preFix_user, tags=["Users"])
 
+users_adapter = TypeAdapter(list[schemas.UserOut])
+
 
 # CREATE USER/SUPERUSER
 @user_router.post(
     "/create-user",
     response_model=schemas.UserOut,
     status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limits.limit_signup)],
 )
-def create_user(
+async def create_user(
     user: schemas.UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> schemas.UserOut:
     """Create a user/superuser.
     Args:
         user (schemas.UserCreate): User data.
-        db (Session): Database session. Defaults to Depends(get_db).
+        db (AsyncSession): Database session. Defaults to Depends(get_async_db).
     Raises:
-        HTTPException: 422 Unprocessable Entity for creation failure.
+        HTTPException: 400 Bad Request if the username or email is taken.
+        HTTPException: 429 Too Many Requests past RATE_LIMIT_SIGNUP_PER_MINUTE.
     Returns:
         schemas.UserCreate: New user data.
     """
 
     # print("Current User: ", current_user)
-    # Hash the password | user.password is a plain text password
-    hashed_password: str = utils.password_hash(user.password)
-    user.password = hashed_password
-    new_user = models.User(**user.model_dump())
-    if not new_user:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="Failed to create user",
-        )
-    # Check if the username or email already exists
-    existing_user: Any = (
-        db.query(models.User)
-        .filter(
+    duplicate = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Username: {user.username} or email: {user.email} already exists",
+    )
+    # Check if the username or email already exists, before paying for bcrypt
+    existing_user: Optional[int] = await db.scalar(
+        select(models.User.id).filter(
             (models.User.username == user.username) | (models.User.email == user.email)
         )
-        .first()
     )
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Username: {user.username} or email: {user.email} already exists",
-        )
-    # Add the new user to the session
-    db.add(new_user)
-    # Commit the changes to the database
-    db.commit()
-    # Refresh the object to get the updated values from the database
-    db.refresh(new_user)
+    if existing_user is not None:
+        raise duplicate
+    # Hash the password | user.password is a plain text password
+    user.password = await utils.password_hash_async(user.password)
+    # ON CONFLICT DO NOTHING: losing a race with a concurrent signup for the same
+    # username/email is a 400 as well, not an IntegrityError
+    new_user: Any = await db.scalar(
+        pg_insert(models.User)
+        .values(**user.model_dump(exclude_none=True))
+        .on_conflict_do_nothing()
+        .returning(models.User)
+    )
+    if new_user is None:
+        raise duplicate
+    # Commit the changes to the database (server defaults came back in RETURNING)
+    await db.commit()
     return new_user
 
 
@@ -73,43 +82,87 @@ def create_user(
     status_code=status.HTTP_200_OK,
 )
 async def get_user_by_username(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: dict = Depends(oauth2.get_current_user),
     limit: int = 100,
     skip: int = 0,
+    cursor: Optional[str] = None,
     search: Optional[str] = "",
-) -> list[schemas.UserOut]:
+    search_mode: utils.search.SearchMode = "substring",
+) -> Response:
     """GET USER/s
     Args:
-    db (Session): Session.
+    db (AsyncSession): Session, a read replica when one is usable.
     current_user (dict): AuthUser.
-    limit, skip (int): No. of users to return/skip, default 100 0.
+    limit, skip (int): No. of users to return/skip, default 100 (max PAGINATION_MAX_LIMIT) 0.
+    cursor (Opt[str]): X-Next-Cursor of the previous page, replaces skip.
     search (Opt[str]): Query, default Null.
+    search_mode (str): "substring" (by id) or "fuzzy" (by relevance).
     Raises:
         HTTPException: 404 Not Found.
     Returns:
-        List[schemas.UserOut]: User data.
+        List[schemas.UserOut]: User data (X-Next-Cursor header if more pages).
     """
     # print("Current User: ", current_user)
     if current_user["is_superuser"]:
-        if search:
-            users: Any = (
-                db.query(models.User)
-                .filter(models.User.username.ilike(f"%{search}%"))
-                .offset(skip)
-                .limit(limit)
-                .all()
+        query: Any = select(models.User)
+        fuzzy: bool = bool(search) and search_mode == "fuzzy"
+        if fuzzy:
+            query = utils.search.fuzzy_search(
+                query, models.User.username, search, cursor
             )
-        else:
-            users = db.query(models.User).offset(skip).limit(limit).all()
-        return users
+        elif search:
+            query = query.filter(models.User.username.ilike(f"%{search}%"))
+        query = utils.pagination.paginate(query, models.User.id, limit, skip, cursor)
+        users: Any = (await db.scalars(query)).all()
+        response: Response = utils.responses.model_response(users_adapter, users)
+        if not fuzzy:
+            utils.pagination.set_next_cursor(response, users, limit)
+        return response
     else:
         users = (
-            db.query(models.User)
-            .filter(models.User.username == current_user["username"])
-            .all()
-        )
-        return users
+            await db.scalars(
+                select(models.User).filter(
+                    models.User.username == current_user["username"]
+                )
+            )
+        ).all()
+        return utils.responses.model_response(users_adapter, users)
+
+
+# EXPORT ALL USERS
+@user_router.get(
+    "/export",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def export_users(
+    session_factory: async_sessionmaker = Depends(get_async_sessionmaker),
+    current_user: dict = Depends(oauth2.get_current_superuser),
+    format: utils.export.ExportFormat = "ndjson",
+) -> StreamingResponse:
+    """EXPORT ALL USERS (superusers only)
+    Args:
+    session_factory (async_sessionmaker): Opens the stream's own session.
+    current_user (dict): AuthUser, must be a superuser.
+    format (str): "ndjson" (one user per line) or "csv".
+    Raises:
+        HTTPException: 403 Forbidden if the user is not a superuser.
+    Returns:
+        StreamingResponse: users.ndjson / users.csv ordered by id, no passwords.
+    """
+    query: Any = select(
+        models.User.id,
+        models.User.username,
+        models.User.email,
+        models.User.is_active,
+        models.User.is_superuser,
+        models.User.user_created_at,
+        models.User.user_updated_at,
+    ).order_by(models.User.id)
+    return utils.export.export_response(
+        session_factory, query, format, "users", settings.EXPORT_BATCH_SIZE
+    )
 
 
 # UPDATE USER BY USERNAME
@@ -117,129 +170,288 @@ async def get_user_by_username(
     "/update/{userName}",
     response_model=schemas.UserCreated,
     status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(rate_limits.limit_user_writes)],
 )
 async def update_user_by_username(
     updated_user: schemas.UserUpdate,
     # username: str,
     userName: str = Path(..., description="The username to update"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(oauth2.get_current_user),
 ) -> schemas.UserCreated:
     """UPDATE USER BY USERNAME (PUT METHOD)
     Args:
         username: str
         user: schemas.UserCreate
-        db: Session, Depends(get_db).
+        db: AsyncSession, Depends(get_async_db).
         current_user (dict): Depends(oauth2.get_current_user).
     Raises:
         HTTPException: 404 Not Found.
+        HTTPException: 403 Forbidden if not the user or a superuser.
     Returns:
         schemas.UserCreated
     """
-    print("Current User: ", current_user)
-    # Check if the user exists
-    user: Any = db.query(models.User).filter(models.User.username == userName).first()
+    # Only superusers may update other users, no query needed to know that
+    if userName != current_user["username"]:
+        if not current_user["is_superuser"]:
+            await _raise_user_not_found_or_forbidden(
+                db,
+                models.User.username == userName,
+                f"username={userName}",
+                current_user,
+            )
+        # Don't pay for bcrypt to answer 404
+        target_id: Optional[int] = await db.scalar(
+            select(models.User.id).filter(models.User.username == userName)
+        )
+        if target_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User with username={userName} not found",
+            )
+    updated_user.password = await utils.password_hash_async(updated_user.password)
+    # One statement: UPDATE ... RETURNING (user_updated_at set by onupdate)
+    user: Any = await db.scalar(
+        update(models.User)
+        .filter(models.User.username == userName)
+        .values(**updated_user.model_dump(exclude_unset=True))
+        .returning(models.User)
+    )
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with username={userName} not found",
         )
-    if user.username == current_user["username"] or current_user["is_superuser"]:
-        hashed_password: str = utils.password_hash(updated_user.password)
-        updated_user.password = hashed_password
-        print("*" * 50)
-        print("updated_user: ", updated_user)
-        print("user: ", updated_user.password)
-        print("*" * 50)
-        # user = models.User(**user.model_dump())
-        # print("Updated User: ", updated_user.model_dump(exclude_unset=True)
-        # Update the user fields with the new values
-        for field, value in updated_user.model_dump(exclude_unset=True).items():
-            setattr(user, field, value)
-        # Commit the changes to the database
-        db.commit()
-        # Refresh the user object to get the updated values from the database
-        db.refresh(user)
-        return user
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Loggein in as User: '{current_user['username']}' | Either not a superuser or Not Authorized",
-        )
+    await db.commit()
+    # Drop the cached auth record so the next request sees the changes
+    oauth2.user_cache.pop(user.id)
+    return user
 
 
 # DELETE USER BY ID
 @user_router.delete(
     "/delete/id/{id}",
     status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(rate_limits.limit_user_writes)],
 )
 async def delete_user_by_id(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(oauth2.get_current_user),
 ):
     """DELETE USER BY ID
     Args:
         id (int): user id
-        db (Session): Session, Depends(get_db).
+        db (AsyncSession): Session, Depends(get_async_db).
         current_user (dict): Depends(oauth2.get_current_user).
     Raises:
         HTTPException: 404 Not Found.
+        HTTPException: 403 Forbidden if not the user or a superuser.
     Returns:
         schemas.ResponseBase
     """
     # print("Current User: ", current_user)
-    user_query = db.query(models.User).filter(models.User.id == id)
-    user = user_query.first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=f"User with id={id} not found"
-        )
-    if user.username == current_user["username"] or current_user["is_superuser"]:
-        user_query.delete(synchronize_session=False)
-        db.commit()
-        return HTTPException(status_code=status.HTTP_204_NO_CONTENT)
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Loggein in as User: '{current_user['username']}' | Either not a superuser or Not Authorized",
+    # One statement, users other than superusers can only delete themselves
+    query: Any = delete(models.User).filter(models.User.id == id)
+    if not current_user["is_superuser"]:
+        query = query.filter(models.User.id == current_user["id"])
+    deleted: Any = (
+        await db.execute(query.returning(models.User.id, _followee_ids()))
+    ).first()
+    if deleted is None:
+        await _raise_user_not_found_or_forbidden(
+            db, models.User.id == id, f"id={id}", current_user
         )
+    # Their follows went with them (ON DELETE CASCADE), so do their counts
+    await _add_follower_count(db, deleted.followee_ids or [], -1)
+    await db.commit()
+    oauth2.user_cache.pop(deleted.id)
+    _forget_cached_posts(deleted.id)
+    return HTTPException(status_code=status.HTTP_204_NO_CONTENT)
 
 
 # DELETE USER BY USERNAME
 @user_router.delete(
     "/delete/{username}",
     status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(rate_limits.limit_user_writes)],
 )
 async def delete_user_by_username(
     username: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: dict = Depends(oauth2.get_current_user),
 ):
     """DELETE USER BY USERNAME
     Args:
         username: str
-        db (Session): Depends(get_db)
+        db (AsyncSession): Depends(get_async_db)
         current_user (dict): Depends(oauth2.get_current_user)
     Raises:
         HTTPException: 404 Not Found.
+        HTTPException: 403 Forbidden if not the user or a superuser.
     Returns:
         schemas.ResponseBase
     """
     # print("Current User: ", current_user)
-    user_query = db.query(models.User).filter(models.User.username == username)
-    user = user_query.first()
-    if user is None:
+    # One statement, users other than superusers can only delete themselves
+    query: Any = delete(models.User).filter(models.User.username == username)
+    if not current_user["is_superuser"]:
+        query = query.filter(models.User.id == current_user["id"])
+    deleted: Any = (
+        await db.execute(query.returning(models.User.id, _followee_ids()))
+    ).first()
+    if deleted is None:
+        await _raise_user_not_found_or_forbidden(
+            db, models.User.username == username, f"username={username}", current_user
+        )
+    # Their follows went with them (ON DELETE CASCADE), so do their counts
+    await _add_follower_count(db, deleted.followee_ids or [], -1)
+    await db.commit()
+    oauth2.user_cache.pop(deleted.id)
+    _forget_cached_posts(deleted.id)
+    return HTTPException(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# FOLLOW A USER
+@user_router.post(
+    "/follow/{id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(rate_limits.limit_user_writes)],
+)
+async def follow_user(
+    id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(oauth2.get_current_user),
+) -> Response:
+    """FOLLOW A USER
+    Their new posts show up in GET /feed, their latest FEED_BACKFILL_POSTS
+    right away. Following a user again is a no-op.
+    Args:
+        id (int): user id to follow
+        db (AsyncSession): Session, Depends(get_async_db).
+        current_user (dict): Depends(oauth2.get_current_user).
+    Raises:
+        HTTPException: 400 Bad Request to follow yourself.
+        HTTPException: 404 Not Found.
+    Returns:
+        Response: 204 No Content
+    """
+    if id == current_user["id"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot follow yourself"
+        )
+    followee: Any = await db.get(models.User, id)
+    if followee is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"User with username={username} not found",
+            detail=f"User with id={id} not found",
         )
-    if user.username == current_user["username"] or current_user["is_superuser"]:
-        user_query.delete(synchronize_session=False)
-        db.commit()
-        return HTTPException(status_code=status.HTTP_204_NO_CONTENT)
-    else:
+    followed: Optional[int] = await db.scalar(
+        pg_insert(models.Follow)
+        .values(follower_id=current_user["id"], followee_id=id)
+        .on_conflict_do_nothing()
+        .returning(models.Follow.followee_id)
+    )
+    if followed is not None:
+        await _add_follower_count(db, [id], 1)
+        await timeline.backfill(db, current_user["id"], followee)
+        await db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# UNFOLLOW A USER
+@user_router.delete(
+    "/follow/{id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    dependencies=[Depends(rate_limits.limit_user_writes)],
+)
+async def unfollow_user(
+    id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(oauth2.get_current_user),
+) -> Response:
+    """UNFOLLOW A USER
+    Their posts leave GET /feed.
+    Args:
+        id (int): user id to unfollow
+        db (AsyncSession): Session, Depends(get_async_db).
+        current_user (dict): Depends(oauth2.get_current_user).
+    Raises:
+        HTTPException: 404 Not Found if not following the user.
+    Returns:
+        Response: 204 No Content
+    """
+    unfollowed: Optional[int] = await db.scalar(
+        delete(models.Follow)
+        .filter(
+            models.Follow.follower_id == current_user["id"],
+            models.Follow.followee_id == id,
+        )
+        .returning(models.Follow.followee_id)
+    )
+    if unfollowed is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Not following user with id={id}",
+        )
+    await _add_follower_count(db, [id], -1)
+    await timeline.remove(db, current_user["id"], id)
+    await db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+async def _add_follower_count(db: AsyncSession, ids: Any, delta: int) -> None:
+    """Add `delta` to follower_count of the users `ids` (a list or a SELECT).
+
+    Users an unfollow brings back down to FEED_FANOUT_MAX_FOLLOWERS are
+    fanned out on write again: their followers are backfilled.
+    """
+    counts: Any = await db.execute(
+        update(models.User)
+        .filter(models.User.id.in_(ids))
+        .values(
+            follower_count=models.User.follower_count + delta,
+            # Not a change of the user, keep it from firing onupdate
+            user_updated_at=models.User.user_updated_at,
+        )
+        .returning(models.User.id, models.User.follower_count)
+    )
+    if delta < 0:
+        threshold: int = settings.FEED_FANOUT_MAX_FOLLOWERS
+        await timeline.backfill_followers(
+            db, [id for id, count in counts if count <= threshold < count - delta]
+        )
+
+
+def _followee_ids() -> Any:
+    """The users the deleted user followed, for DELETE ... RETURNING: its
+    follows are only cascade-deleted at the end of the statement."""
+    return (
+        select(func.array_agg(models.Follow.followee_id))
+        .filter(models.Follow.follower_id == models.User.id)
+        .scalar_subquery()
+        .label("followee_ids")
+    )
+
+
+def _forget_cached_posts(owner_id: int) -> None:
+    """Drop the posts of a deleted user (cascade-deleted) from post_cache."""
+    post_cache.pop_matching(
+        lambda post: isinstance(post, CachedPost) and post.owner_id == owner_id
+    )
+    post_cache.pop(LATEST_POST_KEY)
+
+
+async def _raise_user_not_found_or_forbidden(
+    db: AsyncSession, condition: Any, description: str, current_user: dict
+) -> None:
+    """404 if no user matches `condition`, else 403 (not the current user)."""
+    if await db.scalar(select(models.User.id).filter(condition)) is None:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Loggein in as User: '{current_user['username']}' | Either not a superuser or Not Authorized",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with {description} not found",
         )
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=f"Loggein in as User: '{current_user['username']}' | Either not a superuser or Not Authorized",
+    )
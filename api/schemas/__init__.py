@@ -1,4 +1,17 @@
+from .admin import CacheStats, PoolStatus, ReplicaStatus
 from .auth import Token, TokenData, UserLogin, UserLoginOut
 from .desc import Desc
-from .post import CreatePost, DeletePost, ResponseBase, ResponseBaseExtended, UpdatePost
+from .health import Readiness
+from .post import (
+    BulkItemError,
+    BulkPostsResult,
+    CreatePost,
+    DeletedPosts,
+    DeletePost,
+    DeletePosts,
+    PostCreated,
+    ResponseBase,
+    ResponseBaseExtended,
+    UpdatePost,
+)
 from .user import UserOut, UserCreate, UserCreated, UserUpdate
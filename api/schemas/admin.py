@@ -0,0 +1,28 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+
+
+class PoolStatus(BaseModel):
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    idle: int
+    overflow: int
+    waits: int
+    wait_avg_ms: float
+    wait_max_ms: float
+    timeouts: int
+
+
+class ReplicaStatus(BaseModel):
+    name: str
+    lag_seconds: Optional[float]  # None: not checked yet or down
+    usable: bool
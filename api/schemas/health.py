@@ -0,0 +1,10 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class Readiness(BaseModel):
+    ready: bool
+    seconds: Optional[float]  # warmup time, None until done
+    steps: dict[str, float]  # ms per finished warmup step
+    errors: dict[str, str]
@@ -66,6 +66,25 @@ class PostCreated(BaseModel):
         from_attributes = True
 
 
+class BulkItemError(BaseModel):
+    index: int  # position of the item in the array / NDJSON stream
+    errors: list[dict[str, Any]]
+
+
+class BulkPostsResult(BaseModel):
+    created: list[PostCreated]
+    errors: list[BulkItemError]
+
+
 class DeletePost(BaseModel):
     id: int
     msg: str = "Post deleted successfully"
+
+
+class DeletePosts(BaseModel):
+    ids: list[int] = Field(..., min_length=1)
+
+
+class DeletedPosts(BaseModel):
+    deleted: list[int]
+    not_deleted: list[int]  # not found, or not owned by the user
@@ -1,8 +1,12 @@
 import datetime
 import re
-from typing import Any, Optional
+from typing import Annotated, Any, Optional
 
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from pydantic import BaseModel, EmailStr, Field, WithJsonSchema, field_validator
+
+# Output only: emails read back from the database were validated (EmailStr) on
+# the way in, validating them again per response dominated user/post list cost
+StoredEmail = Annotated[str, WithJsonSchema({"type": "string", "format": "email"})]
 
 
 class UserBaseWithValidator(BaseModel):
@@ -52,7 +56,7 @@ class UserCreate(UserBase):
 
 class UserCreated(UserBaseWithValidator):
     username: str
-    email: EmailStr
+    email: StoredEmail
 
 
 class UserOut(UserCreated):
@@ -63,4 +67,3 @@ class UserOut(UserCreated):
 
 class UserUpdate(UserCreate):
     is_active: Optional[bool] = True
-    
@@ -1,19 +1,28 @@
-from typing import Any, Generator
+from typing import Any, AsyncGenerator, Generator
 
 import pytest
 from fastapi import Response, status
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from alembic import command
 from alembic.config import Config
-from api import routers, schemas
+from api import oauth2, rate_limits, routers, schemas
 from api.config import API_V1_STR, settings
 from api.db import models
-from api.db.database import Base, get_db
+from api.db.database import (
+    Base,
+    get_async_db,
+    get_async_read_db,
+    get_async_sessionmaker,
+    get_db,
+)
 from api.main import app
+from api.routers.post import post_cache
 
 from .config import (
     test_email,
@@ -44,6 +53,22 @@ engine: create_engine = create_engine(
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the API routes. TestClient runs every request on its own
+# event loop, so pooled connections can't be shared between requests.
+SQLALCHEMY_ASYNC_DATABASE_URL: str = SQLALCHEMY_DATABASE_URL.replace(
+    "postgresql://", "postgresql+psycopg_async://", 1
+)
+
+async_engine: create_async_engine = create_async_engine(
+    SQLALCHEMY_ASYNC_DATABASE_URL,
+    poolclass=NullPool,
+    echo=True,
+)
+
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 ## Alembic
 # @pytest.fixture(scope="session")
@@ -88,7 +113,20 @@ def client(session) -> Generator[sessionmaker, Any, None]:
         finally:
             session.close()
 
+    async def override_get_async_db() -> AsyncGenerator[AsyncSession, None]:
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
+    app.dependency_overrides[get_async_sessionmaker] = lambda: TestingAsyncSessionLocal
+    # ids restart for every test database, don't leak cached users between tests
+    oauth2.user_cache.clear()
+    oauth2.token_cache.clear()
+    post_cache.clear()
+    for limiter in rate_limits.LIMITERS.values():
+        limiter.clear()
     yield TestClient(app)
 
 
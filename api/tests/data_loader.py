@@ -1,7 +1,5 @@
 from typing import Any, List, Optional
 
-import openpyxl
-
 
 def get_data_from_excel(
     filename: str, sheet_name: str, column_names: List[str]
@@ -10,6 +8,8 @@ def get_data_from_excel(
     print(f"Loading test data from Excel File......")
     print(f"Test Data File: {filename}, Sheet: {sheet_name}, Columns: {column_names}")
 
+    import openpyxl  # only needed while loading the test data
+
     workbook: openpyxl = openpyxl.load_workbook(filename, data_only=True)
     sheet: Any = (
         workbook[sheet_name] if sheet_name in workbook.sheetnames else workbook.active
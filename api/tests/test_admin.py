@@ -0,0 +1,30 @@
+from typing import Any
+
+from fastapi import Response, status
+
+from api import schemas
+from api.config import API_V1_STR, settings
+
+
+def test_get_db_pool(authorized_client, test_user) -> None:
+    assert test_user["is_superuser"]
+    response: Response = authorized_client.get(f"{API_V1_STR}/admin/db/pool")
+    assert response.status_code == status.HTTP_200_OK
+    pools: dict[str, Any] = response.json()
+    assert set(pools) == {"async", "sync"}
+    for pool in pools.values():
+        pool_status = schemas.PoolStatus(**pool)
+        assert pool_status.pool_size == settings.DB_POOL_SIZE
+        assert pool_status.max_overflow == settings.DB_MAX_OVERFLOW
+
+
+def test_get_db_pool_unauthorized(client) -> None:
+    response: Response = client.get(f"{API_V1_STR}/admin/db/pool")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_get_db_replicas(authorized_client, test_user) -> None:
+    # No DB_REPLICA_HOSTNAMES in the test settings
+    response: Response = authorized_client.get(f"{API_V1_STR}/admin/db/replicas")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
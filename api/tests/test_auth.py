@@ -1,11 +1,20 @@
+import os
+import runpy
+import time
+from datetime import timedelta
 from typing import Any, Optional
 
+import jose.jwt
 import pytest
-from fastapi import Response, status
+from fastapi import HTTPException, Response, status
+from fastapi.testclient import TestClient
 from jose import jwt
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
-from api import schemas
+import api
+from api import oauth2, rate_limits, schemas, utils
 from api.config import API_V1_STR, settings
+from api.main import app
 
 # don't need to import since every test looks for conftest.py file and it's components
 # from .conftest import client, session, test_user
@@ -55,3 +64,78 @@ def test_incorrect_login(test_user, client, email, password) -> None:
 
         assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
         print("*" * 120)
+
+
+def test_login_rate_limited(client, test_user, monkeypatch) -> None:
+    monkeypatch.setattr(rate_limits.login_limiter, "rate", 2)
+    verified: list[str] = []
+    verify_password_async = utils.verify_password_async
+
+    async def counting_verify(plain: str, hashed: str) -> bool:
+        verified.append(plain)
+        return await verify_password_async(plain, hashed)
+
+    monkeypatch.setattr(utils, "verify_password_async", counting_verify)
+    data: dict[str, str] = {"username": test_user["email"], "password": "wrong"}
+    for _ in range(2):
+        response: Response = client.post(f"{API_V1_STR}/login", data=data)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+    response = client.post(f"{API_V1_STR}/login", data=data)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(response.headers["Retry-After"]) > 0
+    assert len(verified) == 2  # no bcrypt for the rejected attempt
+
+
+def test_login_rate_limited_per_forwarded_ip(client, test_user, monkeypatch) -> None:
+    # The app as UvicornWorker serves it with the forwarded_allow_ips of
+    # gunicorn.conf.py, behind a proxy (the test client)
+    monkeypatch.delenv("FORWARDED_ALLOW_IPS", raising=False)
+    conf: dict[str, Any] = runpy.run_path(
+        os.path.join(os.path.dirname(api.__file__), "..", "gunicorn.conf.py")
+    )
+    proxied = TestClient(
+        ProxyHeadersMiddleware(app, trusted_hosts=conf["forwarded_allow_ips"])
+    )
+    monkeypatch.setattr(rate_limits.login_limiter, "rate", 1)
+    data: dict[str, str] = {"username": test_user["email"], "password": "wrong"}
+
+    def login(ip: str) -> int:
+        headers: dict[str, str] = {"X-Forwarded-For": ip}
+        return proxied.post(
+            f"{API_V1_STR}/login", data=data, headers=headers
+        ).status_code
+
+    assert login("203.0.113.1") == status.HTTP_403_FORBIDDEN
+    assert login("203.0.113.1") == status.HTTP_429_TOO_MANY_REQUESTS
+    assert login("203.0.113.2") == status.HTTP_403_FORBIDDEN
+
+
+def test_verify_access_token_cached(monkeypatch) -> None:
+    decoded: list[str] = []
+    decode = jose.jwt.decode
+
+    def counting_decode(token: str, *args: Any, **kwargs: Any) -> dict[str, Any]:
+        decoded.append(token)
+        return decode(token, *args, **kwargs)
+
+    monkeypatch.setattr(jose.jwt, "decode", counting_decode)
+    oauth2.token_cache.clear()
+    claims: dict[str, Any] = {
+        "user_id": 1,
+        "username": "cached",
+        "is_active": True,
+        "is_superuser": False,
+    }
+    error = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    token: str = oauth2.create_access_token(claims, timedelta(seconds=30))
+    first = oauth2.verify_access_token(token, error)
+    assert oauth2.verify_access_token(token, error) == first
+    assert len(decoded) == 1
+    # The entry expires with the token, not after AUTH_TOKEN_CACHE_TTL_SECONDS
+    ((expires_at, _),) = oauth2.token_cache._data.values()
+    assert expires_at <= time.monotonic() + 30
+
+    expired: str = oauth2.create_access_token(claims, timedelta(seconds=-1))
+    with pytest.raises(HTTPException):
+        oauth2.verify_access_token(expired, error)
+    assert len(oauth2.token_cache) == 1  # failures are not cached
@@ -0,0 +1,157 @@
+from typing import Any
+
+from fastapi import Response, status
+
+from api import routers
+from api.config import API_V1_STR, settings
+from api.db import models
+from api.utils.pagination import NEXT_CURSOR_HEADER
+
+from .config import email, password, username
+
+preFixPost: str = f"{API_V1_STR}{routers.preFix_post}"
+preFixUser: str = f"{API_V1_STR}{routers.preFix_user}"
+
+
+def login_as(client, i: int, prefix: str = "") -> tuple[int, dict[str, str]]:
+    """Create user `i` of the test data, return its id and auth headers.
+
+    With `prefix`, another user with the password of user `i`.
+    """
+    user: dict[str, str] = {
+        "username": prefix + username[i],
+        "email": prefix + email[i],
+        "password": password[i],
+    }
+    response: Response = client.post(f"{preFixUser}/create-user", json=user)
+    assert response.status_code == status.HTTP_201_CREATED
+    user_id: int = response.json()["id"]
+    response = client.post(
+        f"{API_V1_STR}/login",
+        data={"username": user["email"], "password": user["password"]},
+    )
+    return user_id, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def create_post(client, headers: dict[str, str], title: str, **post: Any) -> int:
+    response: Response = client.post(
+        f"{preFixPost}/create",
+        json={"title": title, "content": title, **post},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()["id"]
+
+
+def feed_titles(client, **params: Any) -> list[str]:
+    response: Response = client.get(f"{API_V1_STR}/feed", params=params)
+    assert response.status_code == status.HTTP_200_OK
+    return [post["title"] for post in response.json()]
+
+
+def test_follow_and_feed(authorized_client, test_user, session) -> None:
+    client = authorized_client
+    author_id, author = login_as(client, 1)
+    create_post(client, {}, "own")
+    create_post(client, author, "before follow")
+    assert feed_titles(client) == ["own"]
+
+    # Backfilled on follow, fanned out on create. Unpublished posts of
+    # others stay out
+    response: Response = client.post(f"{preFixUser}/follow/{author_id}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert feed_titles(client) == ["before follow", "own"]
+    create_post(client, author, "after follow")
+    create_post(client, author, "draft", published=False)
+    assert feed_titles(client) == ["after follow", "before follow", "own"]
+    assert session.get(models.User, author_id).follower_count == 1
+
+    # Keyset pages
+    response = client.get(f"{API_V1_STR}/feed", params={"limit": 2})
+    cursor: str = response.headers[NEXT_CURSOR_HEADER]
+    assert feed_titles(client, limit=2, cursor=cursor) == ["own"]
+
+    # Following twice is a no-op
+    client.post(f"{preFixUser}/follow/{author_id}")
+    session.expire_all()
+    assert session.get(models.User, author_id).follower_count == 1
+
+    response = client.delete(f"{preFixUser}/follow/{author_id}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert feed_titles(client) == ["own"]
+    session.expire_all()
+    assert session.get(models.User, author_id).follower_count == 0
+    response = client.delete(f"{preFixUser}/follow/{author_id}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_follow_invalid(authorized_client, test_user) -> None:
+    response: Response = authorized_client.post(
+        f"{preFixUser}/follow/{test_user['id']}"
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = authorized_client.post(f"{preFixUser}/follow/999999")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_feed_fan_out_on_read(
+    authorized_client, test_user, session, monkeypatch
+) -> None:
+    client = authorized_client
+    author_id, author = login_as(client, 1)
+    client.post(f"{preFixUser}/follow/{author_id}")
+    # The author now has too many followers to fan out on write
+    monkeypatch.setattr(settings, "FEED_FANOUT_MAX_FOLLOWERS", 0)
+    post_id: int = create_post(client, author, "popular")
+    assert session.query(models.Timeline).filter_by(post_id=post_id).count() == 0
+    assert feed_titles(client) == ["popular"]
+
+
+def test_deleted_follower_uncounted(authorized_client, test_user, session) -> None:
+    author_id, _ = login_as(authorized_client, 1)
+    authorized_client.post(f"{preFixUser}/follow/{author_id}")
+    assert session.get(models.User, author_id).follower_count == 1
+    response: Response = authorized_client.delete(
+        f"{preFixUser}/delete/{test_user['username']}"
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    session.expire_all()
+    assert session.get(models.User, author_id).follower_count == 0
+
+
+def test_feed_fan_out_threshold_crossed(
+    authorized_client, test_user, session, monkeypatch
+) -> None:
+    client = authorized_client
+    monkeypatch.setattr(settings, "FEED_FANOUT_MAX_FOLLOWERS", 1)
+    author_id, author = login_as(client, 1)
+    _, fan = login_as(client, 0, prefix="fan")
+    client.post(f"{preFixUser}/follow/{author_id}")
+    create_post(client, author, "fanned out")
+
+    # Up: a second follower puts the author over, new posts are read
+    client.post(f"{preFixUser}/follow/{author_id}", headers=fan)
+    post_id: int = create_post(client, author, "while popular")
+    assert session.query(models.Timeline).filter_by(post_id=post_id).count() == 0
+    assert feed_titles(client) == ["while popular", "fanned out"]
+
+    # Down: read() stops merging them in, the followers are backfilled
+    response: Response = client.delete(f"{preFixUser}/follow/{author_id}", headers=fan)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert session.query(models.Timeline).filter_by(post_id=post_id).count() == 1
+    assert feed_titles(client) == ["while popular", "fanned out"]
+    create_post(client, author, "fanned out again")
+    assert feed_titles(client) == ["fanned out again", "while popular", "fanned out"]
+
+
+def test_forbidden_delete_keeps_counts(authorized_client, test_user, session) -> None:
+    author_id, author = login_as(authorized_client, 1)
+    authorized_client.post(f"{preFixUser}/follow/{author_id}")
+    # The author can't delete the follower: nothing is written
+    for url in (f"delete/{test_user['username']}", f"delete/id/{test_user['id']}"):
+        response: Response = authorized_client.delete(
+            f"{preFixUser}/{url}", headers=author
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        session.expire_all()
+        assert session.get(models.User, author_id).follower_count == 1
@@ -0,0 +1,53 @@
+import asyncio
+
+from fastapi import Response, status
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from api import schemas, warmup
+
+from .conftest import SQLALCHEMY_ASYNC_DATABASE_URL
+
+
+def test_ready_after_warmup(client, monkeypatch) -> None:
+    monkeypatch.setattr(warmup, "state", warmup.WarmupState())
+    response: Response = client.get("/health/live")
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get("/health/ready")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["ready"] is False
+
+    test_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=NullPool)
+    monkeypatch.setattr(warmup, "async_engine", test_engine)
+    asyncio.run(warmup.run(connections=2))
+    response = client.get("/health/ready")
+    assert response.status_code == status.HTTP_200_OK
+    readiness = schemas.Readiness(**response.json())
+    assert readiness.ready and readiness.errors == {}
+    assert set(readiness.steps) == {
+        "db",
+        "replicas",
+        "password_hashing",
+        "tokens",
+        "response_models",
+    }
+
+
+def test_warmup_db_retries(monkeypatch) -> None:
+    monkeypatch.setattr(warmup, "state", warmup.WarmupState())
+    down = create_async_engine(
+        "postgresql+psycopg_async://nobody:x@127.0.0.1:1/nothing",
+        poolclass=NullPool,
+        connect_args={"connect_timeout": 1},
+    )
+    monkeypatch.setattr(warmup, "async_engine", down)
+
+    async def wait_for_retry() -> None:
+        task = asyncio.create_task(warmup.warm_db(connections=1))
+        while "db" not in warmup.state.errors:
+            await asyncio.sleep(0.01)
+        # Still retrying, not ready
+        assert not task.done() and not warmup.state.ready
+        task.cancel()
+
+    asyncio.run(wait_for_retry())
@@ -0,0 +1,27 @@
+from fastapi import Response, status
+
+from api import routers
+from api.config import API_V1_STR
+
+preFixPost: str = routers.preFix_post
+
+
+def test_metrics(authorized_client, test_posts) -> None:
+    authorized_client.get(f"{API_V1_STR}{preFixPost}/id/{test_posts[0].id}")
+    authorized_client.get(f"{API_V1_STR}{preFixPost}/id/999")
+    response: Response = authorized_client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    body: str = response.text
+    # Route templates, not raw paths
+    route: str = f'route="{API_V1_STR}{preFixPost}/id/{{id}}"'
+    assert f'http_requests_total{{method="GET",{route},status="200"}}' in body
+    assert f'http_requests_total{{method="GET",{route},status="404"}}' in body
+    assert f'http_request_duration_seconds_count{{method="GET",{route}}}' in body
+    assert f'db_request_duration_seconds_count{{method="GET",{route}}}' in body
+    assert "http_requests_in_progress" in body
+    # test_user signed up and logged in
+    assert 'password_hash_duration_seconds_count{operation="hash"}' in body
+    assert 'password_hash_duration_seconds_count{operation="verify"}' in body
+    assert "password_hash_in_flight 0.0" in body
+    assert "password_hash_queue_depth 0.0" in body
@@ -1,14 +1,25 @@
+import csv
+import io
+import json
 from typing import Any
 
 import pytest
 from dateutil import parser
 from fastapi import Response, status
 
-from api import routers, schemas
-from api.config import API_V1_STR
+from api import middleware, rate_limits, routers, schemas, utils
+from api.config import API_V1_STR, settings
+from api.db import models
+from api.routers.post import post_cache
 
 # Assuming .config and .conftest are correctly set up and imported
-from .config import testpost_content, testpost_published, testpost_title, username
+from .config import (
+    password,
+    testpost_content,
+    testpost_published,
+    testpost_title,
+    username,
+)
 
 # don't need to import since every test looks for conftest.py file and it's components
 # from .conftest import client, session
@@ -37,6 +48,81 @@ def test_get_posts(authorized_client, test_posts) -> None:
         assert response_data[i].get("published") == test_posts[i].published
 
 
+# Test Get Posts without N+1 owner queries
+def test_get_posts_query_count(
+    authorized_client, session, test_posts, monkeypatch
+) -> None:
+    monkeypatch.setattr(settings, "QUERY_COUNT_HEADER", True)
+    owners: list[models.User] = [
+        models.User(
+            username=f"owner{i}", email=f"owner{i}@gmail.com", password=password[0]
+        )
+        for i in range(5)
+    ]
+    session.add_all(owners)
+    session.commit()
+    session.add_all(
+        [
+            models.Posts(title=f"owner{i} title", content="content", owner_id=owner.id)
+            for i, owner in enumerate(owners)
+        ]
+    )
+    session.commit()
+
+    response: Response = authorized_client.get(f"{API_V1_STR}{preFixPost}/get")
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == len(test_posts) + len(owners)
+    # Auth user lookup + one SELECT for the posts and their owners
+    assert int(response.headers[middleware.QUERY_COUNT_HEADER]) == 2
+    response = authorized_client.get(f"{API_V1_STR}{preFixPost}/id/{test_posts[0].id}")
+    # Auth user is cached now, so just the post and its owner
+    assert int(response.headers[middleware.QUERY_COUNT_HEADER]) == 1
+    response = authorized_client.get(f"{API_V1_STR}{preFixPost}/latest")
+    assert int(response.headers[middleware.QUERY_COUNT_HEADER]) == 1
+    # Owner lookup + INSERT ... RETURNING
+    response = authorized_client.post(
+        f"{API_V1_STR}{preFixPost}/create", json={"title": "title", "content": "c"}
+    )
+    assert int(response.headers[middleware.QUERY_COUNT_HEADER]) == 2
+
+
+# Test Get Posts with cursor pagination
+def test_get_posts_cursor(authorized_client, test_posts) -> None:
+    ids: list[int] = []
+    url: str = f"{API_V1_STR}{preFixPost}/get?limit=1"
+    while url:
+        response: Response = authorized_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) <= 1
+        ids += [post["id"] for post in response.json()]
+        cursor: str | None = response.headers.get(utils.pagination.NEXT_CURSOR_HEADER)
+        url = f"{API_V1_STR}{preFixPost}/get?limit=1&cursor={cursor}" if cursor else ""
+    assert ids == [post.id for post in test_posts]
+
+
+# Test Get Posts with an invalid cursor
+def test_get_posts_invalid_cursor(authorized_client, test_posts) -> None:
+    response: Response = authorized_client.get(
+        f"{API_V1_STR}{preFixPost}/get?cursor=not-a-cursor"
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# Test Get Posts with fuzzy (trigram) search
+def test_get_posts_fuzzy_search(authorized_client, test_posts) -> None:
+    response: Response = authorized_client.get(
+        f"{API_V1_STR}{preFixPost}/get?search={test_posts[-1].title}&search_mode=fuzzy"
+    )
+    assert response.status_code == status.HTTP_200_OK
+    # Most relevant first: the exact match
+    assert response.json()[0]["title"] == test_posts[-1].title
+    assert utils.pagination.NEXT_CURSOR_HEADER not in response.headers
+    response = authorized_client.get(
+        f"{API_V1_STR}{preFixPost}/get?search=title&search_mode=fuzzy&cursor=abc"
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 # Test Create Post
 @pytest.mark.parametrize(
     "test_post_title, test_post_content, test_post_published",
@@ -72,6 +158,109 @@ def test_create_post(
     assert response_data.get("published") == test_post_published
 
 
+# Test Export Posts
+def test_export_posts(authorized_client, test_posts, monkeypatch) -> None:
+    # several server-side cursor batches
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    response: Response = authorized_client.get(f"{API_V1_STR}{preFixPost}/export")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == utils.ndjson.NDJSON_MEDIA_TYPE
+    rows: list[dict[str, Any]] = [
+        json.loads(line) for line in response.text.splitlines()
+    ]
+    posts: list[Any] = sorted(test_posts, key=lambda post: post.id)
+    assert [row["id"] for row in rows] == [post.id for post in posts]
+    assert [row["title"] for row in rows] == [post.title for post in posts]
+
+
+def test_export_posts_csv(authorized_client, test_posts) -> None:
+    response: Response = authorized_client.get(
+        f"{API_V1_STR}{preFixPost}/export", params={"format": "csv"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    rows: list[dict[str, str]] = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == len(test_posts)
+    assert rows[0]["title"] == min(test_posts, key=lambda post: post.id).title
+
+
+def test_create_post_rate_limited(authorized_client, monkeypatch) -> None:
+    monkeypatch.setattr(rate_limits.user_writes_limiter, "rate", 1)
+    data: dict[str, Any] = {"title": "limited", "content": "one per minute"}
+    url: str = f"{API_V1_STR}{preFixPost}/create"
+    assert authorized_client.post(url, json=data).status_code == status.HTTP_201_CREATED
+    response: Response = authorized_client.post(url, json=data)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert "Retry-After" in response.headers
+
+
+# Test Bulk Create Posts
+def test_create_posts_bulk(authorized_client, test_user, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "POST_BULK_BATCH_SIZE", 2)
+    data: list[Any] = [
+        {"title": "bulk 1", "content": "content 1"},
+        {"title": "", "content": "empty title"},
+        {"title": "bulk 2", "content": "content 2", "published": False},
+        {"title": "bulk 3", "content": "content 3"},
+    ]
+    response: Response = authorized_client.post(
+        f"{API_V1_STR}{preFixPost}/bulk", json=data
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    result = schemas.BulkPostsResult(**response.json())
+    assert [post.title for post in result.created] == ["bulk 1", "bulk 2", "bulk 3"]
+    assert [error.index for error in result.errors] == [1]
+    assert result.errors[0].errors[0]["loc"] == ["title"]
+
+
+def test_create_posts_bulk_ndjson(authorized_client, test_user) -> None:
+    lines: list[str] = [
+        '{"title": "ndjson 1", "content": "content 1"}',
+        "not json",
+        "",
+        '{"title": "ndjson 2", "content": "content 2"}',
+    ]
+    response: Response = authorized_client.post(
+        f"{API_V1_STR}{preFixPost}/bulk",
+        content="\n".join(lines),
+        headers={"Content-Type": utils.ndjson.NDJSON_MEDIA_TYPE},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    result = schemas.BulkPostsResult(**response.json())
+    assert [post.title for post in result.created] == ["ndjson 1", "ndjson 2"]
+    assert [error.index for error in result.errors] == [1]
+
+
+@pytest.mark.parametrize(
+    "data, status_code",
+    [
+        ({"title": "not", "content": "an array"}, status.HTTP_400_BAD_REQUEST),
+        ([], status.HTTP_422_UNPROCESSABLE_ENTITY),
+        ([{"title": "no content"}], status.HTTP_422_UNPROCESSABLE_ENTITY),
+    ],
+)
+def test_create_posts_bulk_invalid(authorized_client, data, status_code) -> None:
+    response: Response = authorized_client.post(
+        f"{API_V1_STR}{preFixPost}/bulk", json=data
+    )
+    assert response.status_code == status_code
+
+
+def test_create_posts_bulk_too_large(authorized_client, test_user, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "POST_BULK_MAX_BYTES", 100)
+    monkeypatch.setattr(settings, "POST_BULK_MAX_LINE_BYTES", 100)
+    post: dict[str, str] = {"title": "big", "content": "x" * 100}
+    url: str = f"{API_V1_STR}{preFixPost}/bulk"
+    response: Response = authorized_client.post(url, json=[post])
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    response = authorized_client.post(
+        url,
+        content=f'{{"title": "ok", "content": "ok"}}\n{json.dumps(post)}',
+        headers={"Content-Type": utils.ndjson.NDJSON_MEDIA_TYPE},
+    )
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
 # Test Get Post By ID
 def test_get_post_by_id(authorized_client, test_posts) -> None:
     # print(f"Test Posts: {test_posts}")
@@ -81,6 +270,35 @@ def test_get_post_by_id(authorized_client, test_posts) -> None:
     assert response.status_code == status.HTTP_200_OK
 
 
+def test_get_post_by_id_etag(authorized_client, test_posts, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "QUERY_COUNT_HEADER", True)
+    url: str = f"{API_V1_STR}{preFixPost}/id/1"
+    response: Response = authorized_client.get(url)
+    etag: str = response.headers["etag"]
+    assert response.status_code == status.HTTP_200_OK
+
+    # Cached: same body and ETag, no query
+    cached: Response = authorized_client.get(url)
+    assert int(cached.headers[middleware.QUERY_COUNT_HEADER]) == 0
+    assert cached.json() == response.json()
+    assert cached.headers["etag"] == etag
+
+    not_modified: Response = authorized_client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.content == b""
+    assert post_cache.stats()["hits"] >= 2
+
+    # Updating the post invalidates the cached copy and changes the ETag
+    authorized_client.put(
+        f"{API_V1_STR}{preFixPost}/update/1",
+        json={"title": "updated title", "content": "updated", "published": True},
+    )
+    updated: Response = authorized_client.get(url, headers={"If-None-Match": etag})
+    assert updated.status_code == status.HTTP_200_OK
+    assert updated.json()["title"] == "updated title"
+    assert updated.headers["etag"] != etag
+
+
 # Test Last Post
 def test_get_post_latest(authorized_client, test_posts) -> None:
     response: Response = authorized_client.get(f"{API_V1_STR}{preFixPost}/latest")
@@ -99,6 +317,26 @@ def test_delete_post_by_id(authorized_client, test_posts) -> None:
     assert response.status_code == status.HTTP_204_NO_CONTENT
 
 
+def test_delete_post_by_id_not_found(authorized_client, test_posts) -> None:
+    response: Response = authorized_client.delete(
+        f"{API_V1_STR}{preFixPost}/delete/999"
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_delete_posts_bulk(authorized_client, test_posts) -> None:
+    ids: list[int] = sorted(post.id for post in test_posts)[:2]
+    response: Response = authorized_client.request(
+        "DELETE", f"{API_V1_STR}{preFixPost}/bulk", json={"ids": [*ids, 999]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = schemas.DeletedPosts(**response.json())
+    assert result.deleted == ids
+    assert result.not_deleted == [999]
+    response = authorized_client.get(f"{API_V1_STR}{preFixPost}/id/{ids[0]}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
 # Test Update Post by Id
 def test_update_post_by_id(
     authorized_client,
@@ -119,6 +357,23 @@ def test_update_post_by_id(
     assert response.json()["published"] == data.get("published")
 
 
+def test_update_post_by_id_single_statement(
+    authorized_client, test_posts, monkeypatch
+) -> None:
+    monkeypatch.setattr(settings, "QUERY_COUNT_HEADER", True)
+    data: dict[str, Any] = {"title": "new title", "content": "new", "published": True}
+    authorized_client.get(f"{API_V1_STR}{preFixPost}/latest")  # cache the auth user
+    response: Response = authorized_client.put(
+        f"{API_V1_STR}{preFixPost}/update/{test_posts[0].id}", json=data
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.json()["owner"]["username"] == test_posts[0].owner.username
+    # UPDATE ... RETURNING joined to the owner
+    assert int(response.headers[middleware.QUERY_COUNT_HEADER]) == 1
+    response = authorized_client.put(f"{API_V1_STR}{preFixPost}/update/999", json=data)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
 # Test Unauthorized Access
 def test_unauthorized_access(client, test_user, test_posts) -> None:
     response: Response = client.get(f"{API_V1_STR}{preFixPost}/get")
@@ -0,0 +1,35 @@
+from fastapi import Response, status
+
+from api import middleware, routers
+from api.config import API_V1_STR, settings
+
+preFixPost: str = routers.preFix_post
+
+
+def test_profile_request(authorized_client, test_posts) -> None:
+    response: Response = authorized_client.get(
+        f"{API_V1_STR}{preFixPost}/get", headers={middleware.PROFILE_HEADER: "1"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert int(response.headers["x-profile-samples"]) > 0
+    # Collapsed stacks: "frame;frame;... count"
+    stack, _, count = response.text.splitlines()[0].rpartition(" ")
+    assert ";" in stack
+    assert int(count) > 0
+
+
+def test_profile_request_disabled(authorized_client, test_posts, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", False)
+    response: Response = authorized_client.get(
+        f"{API_V1_STR}{preFixPost}/get", params={"profile": "1"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert isinstance(response.json(), list)
+
+
+def test_profile_request_unauthenticated(client, test_posts) -> None:
+    response: Response = client.get(
+        f"{API_V1_STR}{preFixPost}/get", params={"profile": "1"}
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,111 @@
+import asyncio
+from typing import Any, AsyncGenerator, Optional
+
+from fastapi import Response, status
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from starlette.requests import Request
+
+from api import routers
+from api.config import API_V1_STR
+from api.db import READ_PRIMARY_COOKIE, get_async_read_db, read_replicas
+from api.db.replica import Replica
+from api.main import app
+from api.routers.post import LATEST_POST_KEY, post_cache
+
+from .conftest import SQLALCHEMY_ASYNC_DATABASE_URL, TestingAsyncSessionLocal
+
+
+def make_replica(url: str) -> Replica:
+    engine = create_async_engine(
+        url, poolclass=NullPool, connect_args={"connect_timeout": 1}
+    )
+    return Replica(name="test", engine=engine, max_lag=5, check_interval=60)
+
+
+def request_with(cookies: str = "") -> Request:
+    headers: list[tuple[bytes, bytes]] = [(b"cookie", cookies.encode())]
+    return Request({"type": "http", "headers": headers if cookies else []})
+
+
+async def read_session_replica(request: Request) -> Optional[str]:
+    """Name of the replica get_async_read_db picks for `request`, if any."""
+    dependency = get_async_read_db(request)
+    db: AsyncSession = await dependency.__anext__()
+    replica: Optional[str] = db.info.get("replica")
+    await dependency.aclose()
+    return replica
+
+
+def test_read_replica_routing(session, monkeypatch) -> None:
+    # The test database stands in for a replica (the lag query gives 0)
+    replica: Replica = make_replica(SQLALCHEMY_ASYNC_DATABASE_URL)
+    monkeypatch.setattr(read_replicas, "replicas", [replica])
+
+    async def route() -> None:
+        # Not checked yet: reads go to the primary while the check runs
+        assert await read_session_replica(request_with()) is None
+        await replica.check()
+        assert replica.lag == 0 and replica.usable
+        assert await read_session_replica(request_with()) == "test"
+        # Read-your-writes: the cookie keeps the client on the primary
+        cookie: str = f"{READ_PRIMARY_COOKIE}=1"
+        assert await read_session_replica(request_with(cookie)) is None
+        replica.lag = 10  # too far behind
+        assert await read_session_replica(request_with()) is None
+
+    asyncio.run(route())
+    asyncio.run(replica.engine.dispose())
+
+
+def test_read_replica_down(monkeypatch) -> None:
+    replica: Replica = make_replica(
+        "postgresql+psycopg_async://nobody:x@127.0.0.1:1/nothing"
+    )
+    monkeypatch.setattr(read_replicas, "replicas", [replica])
+    asyncio.run(replica.check())
+    assert replica.lag is None
+    assert read_replicas.choose() is None
+    assert replica.status() == {"name": "test", "lag_seconds": None, "usable": False}
+
+
+def test_read_your_writes_cookie(authorized_client, monkeypatch) -> None:
+    url: str = f"{API_V1_STR}{routers.preFix_post}"
+    data: dict[str, Any] = {"title": "sticky", "content": "read your writes"}
+    # No replicas: no cookie
+    response: Response = authorized_client.post(f"{url}/create", json=data)
+    assert READ_PRIMARY_COOKIE not in response.cookies
+
+    replica: Replica = make_replica(SQLALCHEMY_ASYNC_DATABASE_URL)
+    monkeypatch.setattr(read_replicas, "replicas", [replica])
+    response = authorized_client.post(f"{url}/create", json=data)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.cookies[READ_PRIMARY_COOKIE] == "1"
+    response = authorized_client.get(f"{url}/id/{response.json()['id']}")
+    assert "set-cookie" not in response.headers
+
+
+def test_replica_reads_not_cached(authorized_client, test_posts, monkeypatch) -> None:
+    url: str = f"{API_V1_STR}{routers.preFix_post}"
+
+    # get_async_read_db as with a usable replica (the test database)
+    async def read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+        async with TestingAsyncSessionLocal() as db:
+            if READ_PRIMARY_COOKIE not in request.cookies:
+                db.info["replica"] = "test"
+            yield db
+
+    monkeypatch.setitem(app.dependency_overrides, get_async_read_db, read_db)
+    # Served by the replica, which may be behind: the cache is left alone
+    response: Response = authorized_client.get(f"{url}/id/{test_posts[0].id}")
+    assert response.status_code == status.HTTP_200_OK
+    response = authorized_client.get(f"{url}/latest")
+    assert response.status_code == status.HTTP_200_OK
+    assert post_cache.get(test_posts[0].id) is None
+    assert post_cache.get(LATEST_POST_KEY) is None
+    # Read-your-writes reads go to the primary, which fills it
+    authorized_client.cookies.set(READ_PRIMARY_COOKIE, "1")
+    authorized_client.get(f"{url}/id/{test_posts[0].id}")
+    authorized_client.get(f"{url}/latest")
+    assert post_cache.get(test_posts[0].id) is not None
+    assert post_cache.get(LATEST_POST_KEY) is not None
@@ -0,0 +1,130 @@
+import os
+import subprocess
+import threading
+import time
+from typing import Any
+
+import pytest
+from fastapi import Response, status
+from loguru import logger
+
+from api import middleware, routers, warmup
+from api.config import (
+    API_V1_STR,
+    RawLog,
+    drain_app_logging,
+    retain_log_files,
+    settings,
+    setup_app_logging,
+)
+
+preFixPost: str = routers.preFix_post
+
+
+@pytest.fixture()
+def access_log(monkeypatch) -> Any:
+    monkeypatch.setattr(settings.logging, "LOGGING_ACCESS_SAMPLE_RATE", 1.0)
+    records: list[dict[str, Any]] = []
+    sink_id: int = logger.add(lambda message: records.append(message.record))
+    yield records
+    logger.remove(sink_id)
+
+
+def test_request_id(client, access_log) -> None:
+    response: Response = client.get(
+        f"{API_V1_STR}/description", headers={middleware.REQUEST_ID_HEADER: "abc"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers[middleware.REQUEST_ID_HEADER] == "abc"
+    access: dict[str, Any] = access_log[-1]
+    assert access["extra"]["request_id"] == "abc"
+    assert access["extra"]["path"] == f"{API_V1_STR}/description"
+    assert access["extra"]["status"] == status.HTTP_200_OK
+    # Generated when the client doesn't send one
+    response = client.get(f"{API_V1_STR}/description")
+    assert len(response.headers[middleware.REQUEST_ID_HEADER]) == 32
+
+
+def test_access_log_sampling(client, access_log, monkeypatch) -> None:
+    monkeypatch.setattr(settings.logging, "LOGGING_ACCESS_SAMPLE_RATE", 0.0)
+    client.get(f"{API_V1_STR}/description")
+    assert not [r for r in access_log if "status" in r["extra"]]
+    # Errors are always logged
+    client.get(f"{API_V1_STR}{preFixPost}/get")
+    assert [r["extra"]["status"] for r in access_log if "status" in r["extra"]] == [
+        status.HTTP_401_UNAUTHORIZED
+    ]
+
+
+def test_readiness_probe_not_an_error(client, access_log, monkeypatch) -> None:
+    monkeypatch.setattr(warmup, "state", warmup.WarmupState())
+    response: Response = client.get("/health/ready")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    access: dict[str, Any] = access_log[-1]
+    assert access["extra"]["status"] == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert access["level"].name == "INFO"
+
+
+def test_file_log_written_off_thread(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    writers: list[str] = []
+    write: Any = RawLog.write
+
+    def recording_write(self: RawLog, message: str) -> None:
+        writers.append(threading.current_thread().name)
+        write(self, message)
+
+    monkeypatch.setattr(RawLog, "write", recording_write)
+    setup_app_logging(config=settings)
+    try:
+        logger.info("to the log file")
+        drain_app_logging()
+        [path] = (tmp_path / "logs").glob(f"file_{os.getpid()}_*.log")
+        assert "to the log file" in path.read_text()
+        assert set(writers) == {"log-writer"}
+    finally:
+        monkeypatch.undo()
+        setup_app_logging(config=settings)
+
+
+def exited_pid() -> int:
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return process.pid
+
+
+def test_file_log_retention(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings.logging, "LOGGING_FILE_ROTATION", "100 B")
+    monkeypatch.setattr(settings.logging, "LOGGING_FILE_RETENTION", 1)
+    # A file of an earlier run
+    earlier = tmp_path / "logs" / f"file_{exited_pid()}_2026-01-01.log"
+    earlier.parent.mkdir()
+    earlier.write_text("earlier run\n")
+    setup_app_logging(config=settings)
+    try:
+        for _ in range(5):
+            logger.info("rotated " * 20)
+        drain_app_logging()
+        assert not earlier.exists()
+        own: list[Any] = list(earlier.parent.glob(f"file_{os.getpid()}_*.log"))
+        assert 0 < len(own) <= 2  # the file kept by retention, the current one
+    finally:
+        monkeypatch.undo()
+        setup_app_logging(config=settings)
+
+
+def test_file_log_retention_keeps_open_files(tmp_path) -> None:
+    def log_file(pid: int, age: int) -> Any:
+        path: Any = tmp_path / f"file_{pid}_{age}.log"
+        path.write_text("log\n")
+        os.utime(path, (time.time() - age, time.time() - age))
+        return path
+
+    pid: int = exited_pid()
+    worker: Any = log_file(os.getppid(), 300)  # a running worker's current file
+    older: Any = log_file(pid, 200)
+    newest: Any = log_file(pid, 100)
+    retain_log_files(str(tmp_path), keep=1)
+    assert newest.exists() and worker.exists()
+    assert not older.exists()
@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Any
+
+from benchmarks.startup import IMPORT_API, LAZY_MODULES
+
+# Seconds `import api.main` may take in a fresh interpreter. About 1s on a
+# single CPU today; STARTUP_BUDGET_SECONDS overrides it for slow CI machines
+STARTUP_BUDGET_SECONDS: float = float(os.environ.get("STARTUP_BUDGET_SECONDS", 3.0))
+
+
+def test_startup_budget(tmp_path) -> None:
+    project_root: str = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    output: str = subprocess.run(
+        [sys.executable, "-c", IMPORT_API, *LAZY_MODULES],
+        # Not the project root: config must not depend on the working directory
+        cwd=tmp_path,
+        env={
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(
+                [project_root, os.environ.get("PYTHONPATH", "")]
+            ),
+        },
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    startup: dict[str, Any] = json.loads(output.splitlines()[-1])
+    assert startup["loaded"] == [], "imported at startup, should be lazy"
+    assert startup["seconds"] < STARTUP_BUDGET_SECONDS
@@ -1,4 +1,5 @@
 import datetime
+import json
 from typing import Any
 
 import pytest
@@ -6,8 +7,9 @@ from dateutil import parser
 from fastapi import Response, status
 
 # from api.routers.user import preFix_user
-from api import routers
+from api import routers, utils
 from api.config import API_V1_STR
+from api.routers.post import LATEST_POST_KEY, post_cache
 
 # Assuming .config and .conftest are correctly set up and imported
 from .config import (
@@ -97,6 +99,23 @@ def test_create_user_invalid_data(
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
 
+# Test Create User with a taken username
+def test_create_user_duplicate_skips_hashing(client, test_user, monkeypatch) -> None:
+    async def password_hash_async(password: str) -> str:
+        raise AssertionError("duplicate signup must not hash the password")
+
+    monkeypatch.setattr(utils, "password_hash_async", password_hash_async)
+    response: Response = client.post(
+        f"{API_V1_STR}{preFixUser}/create-user",
+        json={
+            "username": test_user["username"],
+            "email": "another" + test_user["email"],
+            "password": test_user["password"],
+        },
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 # Test Get User by Username
 def test_get_user_by_username(
     authorized_client,
@@ -110,6 +129,17 @@ def test_get_user_by_username(
     assert response.json()[0]["username"] == test_username[0]
 
 
+# Test Export Users
+def test_export_users(authorized_client, test_user) -> None:
+    response: Response = authorized_client.get(f"{API_V1_STR}{preFixUser}/export")
+    assert response.status_code == status.HTTP_200_OK
+    rows: list[dict[str, Any]] = [
+        json.loads(line) for line in response.text.splitlines()
+    ]
+    assert [row["username"] for row in rows] == [test_user["username"]]
+    assert "password" not in rows[0]
+
+
 # Test Update User by Username
 def test_update_user_by_username(
     authorized_client,
@@ -129,6 +159,26 @@ def test_update_user_by_username(
     assert response.json()["email"] == test_email[0]
 
 
+def test_update_missing_user_skips_hashing(authorized_client, monkeypatch) -> None:
+    hashed: list[str] = []
+
+    async def counting_hash(password: str) -> str:
+        hashed.append(password)
+        return password
+
+    monkeypatch.setattr(utils, "password_hash_async", counting_hash)
+    response: Response = authorized_client.put(
+        f"{API_V1_STR}{preFixUser}/update/nobody",
+        json={
+            "username": "nobody",
+            "email": "nobody@gmail.com",
+            "password": test_password[0],
+        },
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert hashed == []
+
+
 # Test Delete User by ID
 def test_delete_user_by_id(
     authorized_client,
@@ -147,3 +197,33 @@ def test_delete_user_by_username(
         f"{API_V1_STR}{preFixUser}/delete/{test_username[0]}",
     )
     assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+# Test Deleted User Token
+def test_deleted_user_token_rejected(
+    authorized_client,
+) -> None:
+    # Warm the auth user cache, then make sure deleting the user invalidates it
+    response: Response = authorized_client.get(f"{API_V1_STR}{preFixUser}/get")
+    assert response.status_code == status.HTTP_200_OK
+    response = authorized_client.delete(
+        f"{API_V1_STR}{preFixUser}/delete/{test_username[0]}",
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    response = authorized_client.get(f"{API_V1_STR}{preFixUser}/get")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+# Test Deleted User Posts Cache
+def test_deleted_user_posts_uncached(authorized_client, test_posts) -> None:
+    preFixPost: str = f"{API_V1_STR}{routers.preFix_post}"
+    authorized_client.get(f"{preFixPost}/id/{test_posts[0].id}")
+    authorized_client.get(f"{preFixPost}/latest")
+    assert post_cache.get(test_posts[0].id) is not None
+    assert post_cache.get(LATEST_POST_KEY) is not None
+    response: Response = authorized_client.delete(
+        f"{API_V1_STR}{preFixUser}/delete/{test_username[0]}",
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert post_cache.get(test_posts[0].id) is None
+    assert post_cache.get(LATEST_POST_KEY) is None
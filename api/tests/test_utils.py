@@ -1,8 +1,12 @@
+import asyncio
+import threading
 from fileinput import filename
 
 import pytest
+from prometheus_client import REGISTRY
 
 from api import utils
+from api.config import settings
 
 from .config import hashed_password, password
 
@@ -33,3 +37,97 @@ def test_verify_password(plain, hashed) -> None:
     assert (
         utils.verify_password(plain, hashed) == True
     ), "Password verification failed for {plain} and {hashed}"
+
+
+# Test verify_password_async
+@pytest.mark.parametrize("plain, hashed", zip(password, hashed_password))
+def test_verify_password_async(plain, hashed) -> None:
+    """
+    Test that verify_password_async gives the same answer from the worker pool.
+    """
+    assert (
+        asyncio.run(utils.verify_password_async(plain, hashed)) == True
+    ), f"Password verification failed for {plain} and {hashed}"
+
+
+# Test password_hash_async
+def test_password_hash_async() -> None:
+    """
+    Hash every password concurrently in the worker pool; nothing should be left
+    in flight once all of them are done.
+    """
+
+    async def hash_all() -> list[str]:
+        return await asyncio.gather(*map(utils.password_hash_async, password))
+
+    hashed_passwords: list[str] = asyncio.run(hash_all())
+    for plain, hashed in zip(password, hashed_passwords):
+        assert utils.verify_password(plain, hashed)
+    assert utils.hash_pool_stats()["in_flight"] == 0
+    assert utils.hash_pool_stats()["queue_depth"] == 0
+
+
+# Test the hashing pool gauges of GET /metrics
+def test_hash_pool_gauges(monkeypatch) -> None:
+    """
+    A hash that waits for a hashing worker is counted in flight and queued.
+    """
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 0)  # all queued
+    release = threading.Event()
+    monkeypatch.setattr(utils.utils, "password_hash", lambda _: release.wait())
+
+    async def hash_while_counted() -> None:
+        job = asyncio.ensure_future(utils.password_hash_async(password[0]))
+        await asyncio.sleep(0)  # submitted
+        assert REGISTRY.get_sample_value("password_hash_in_flight") == 1
+        assert REGISTRY.get_sample_value("password_hash_queue_depth") == 1
+        release.set()
+        await job
+
+    asyncio.run(hash_while_counted())
+    assert REGISTRY.get_sample_value("password_hash_in_flight") == 0
+    assert REGISTRY.get_sample_value("password_hash_queue_depth") == 0
+
+
+# Test TTLCache
+def test_ttl_cache() -> None:
+    """
+    Entries expire after their ttl and the least recently used entry is evicted
+    once the cache is full.
+    """
+    cache = utils.TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    cache.set("a", 1, ttl=0)
+    assert cache.get("a") is None
+    assert cache.pop("c") == 3
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.pop_matching(lambda value: value > 1) == 1
+    assert cache.get("a") == 1 and cache.get("b") is None
+
+
+# Test RateLimiter
+def test_rate_limiter() -> None:
+    """
+    Every key bursts `rate` requests, is then told how long to wait, and the
+    least recently used key is dropped once there are more than maxsize.
+    """
+    limiter = utils.RateLimiter(rate=2, per=60, maxsize=2)
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") == 0
+    retry_after: float = limiter.acquire("a")
+    assert 0 < retry_after <= 30  # one token every 30 seconds
+    assert limiter.acquire("b") == 0
+    assert limiter.acquire("c") == 0
+    assert len(limiter) == 2
+    assert limiter.acquire("a") == 0  # evicted, starts with a full bucket
+    assert limiter.rejected == 1
+    assert utils.RateLimiter(rate=0).acquire("a") == 0  # disabled
@@ -1 +1,11 @@
-from .utils import password_hash, verify_password
\ No newline at end of file
+from . import etag, export, ndjson, pagination, profiling, responses, search
+from .cache import TTLCache
+from .rate_limit import RateLimiter
+from .utils import (
+    hash_pool_stats,
+    password_hash,
+    password_hash_async,
+    shutdown_hash_executor,
+    verify_password,
+    verify_password_async,
+)
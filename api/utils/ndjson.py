@@ -0,0 +1,39 @@
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, status
+
+NDJSON_MEDIA_TYPE: str = "application/x-ndjson"
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """Split a newline-delimited JSON stream into its (non-blank) lines.
+
+    Lines are yielded undecoded, as they arrive, so a large upload is never
+    held in memory and each line can be validated on its own (e.g. with
+    Model.model_validate_json).
+
+    Args:
+        chunks: request.stream() or any async iterator of bytes
+        max_line_bytes (int, optional): longest line buffered
+    Raises:
+        HTTPException: 413 Request Entity Too Large for a longer line
+    Yields:
+        bytes: one JSON document per line
+    """
+    buffer: bytes = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in [*lines, buffer]:
+            if max_line_bytes is not None and len(line) > max_line_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Lines of at most {max_line_bytes} bytes",
+                )
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
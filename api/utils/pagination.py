@@ -0,0 +1,57 @@
+import base64
+import json
+from typing import Any, Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select
+
+from api.config import settings
+
+# Opaque cursor of the next page, sent back as ?cursor=...
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor made by encode_cursor.
+
+    Raises:
+        HTTPException: 400 Bad Request for a malformed cursor
+    """
+    try:
+        last_id: Any = json.loads(base64.urlsafe_b64decode(cursor.encode()))["id"]
+        if not isinstance(last_id, int):
+            raise TypeError(last_id)
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return last_id
+
+
+def page_size(limit: int) -> int:
+    """Clamp the requested limit to settings.PAGINATION_MAX_LIMIT."""
+    return max(1, min(limit, settings.PAGINATION_MAX_LIMIT))
+
+
+def paginate(
+    query: Select, id_column: Any, limit: int, skip: int, cursor: Optional[str]
+) -> Select:
+    """Order by `id_column` and apply keyset (cursor) or offset pagination.
+
+    With a cursor the page starts right after the last id of the previous one
+    (an index range scan), otherwise `skip` rows are skipped as before.
+    """
+    query = query.order_by(id_column).limit(page_size(limit))
+    if cursor:
+        return query.filter(id_column > decode_cursor(cursor))
+    return query.offset(skip)
+
+
+def set_next_cursor(response: Response, rows: list[Any], limit: int) -> None:
+    """Set the next page cursor header when the page is full."""
+    if rows and len(rows) >= page_size(limit):
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
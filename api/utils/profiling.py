@@ -0,0 +1,56 @@
+import collections
+import sys
+import threading
+import time
+from types import FrameType
+from typing import Optional
+
+
+class StackSampler:
+    """Sampling profiler of one thread, output as collapsed stacks.
+
+    A background thread records the target thread's stack every `interval`
+    seconds. collapsed() returns one "root;...;leaf count" line per distinct
+    stack, the input format of flamegraph.pl, speedscope and inferno.
+
+    Args:
+        thread_id (int): thread to sample, e.g. threading.get_ident()
+        interval (float): seconds between samples
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id: int = thread_id
+        self.interval: float = interval
+        self.samples: collections.Counter[str] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.samples.most_common()
+        )
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            frame: Optional[FrameType] = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[_collapse(frame)] += 1
+            time.sleep(self.interval)
+
+
+def _collapse(frame: Optional[FrameType]) -> str:
+    stack: list[str] = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{frame.f_globals.get('__name__', '?')}.{code.co_qualname}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
@@ -0,0 +1,59 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class RateLimiter:
+    """In-process token bucket per key.
+
+    Every key may burst `rate` requests, then gets one more every
+    `per / rate` seconds. Idle buckets refill completely, so the least
+    recently used ones are evicted first when there are more than `maxsize`.
+
+    Args:
+        rate (int): requests per `per` seconds (and burst size), <= 0 disables
+        per (float): window in seconds. Defaults to 60
+        maxsize (int): max number of tracked keys
+    """
+
+    def __init__(self, rate: int, per: float = 60.0, maxsize: int = 100_000) -> None:
+        self.rate: int = rate
+        self.per: float = per
+        self.maxsize: int = maxsize
+        self.rejected: int = 0
+        # key -> (tokens, monotonic time of the last update)
+        self._buckets: OrderedDict[Hashable, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: Hashable) -> float:
+        """Take a token for `key`.
+
+        Returns:
+            float: 0 if allowed, else seconds until a token is available
+        """
+        if self.rate <= 0:
+            return 0.0
+        now: float = time.monotonic()
+        refill: float = self.rate / self.per  # tokens per second
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.rate, now))
+            tokens = min(self.rate, tokens + (now - updated) * refill)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self._buckets.move_to_end(key)
+                self.rejected += 1
+                return (1 - tokens) / refill
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
@@ -0,0 +1,35 @@
+from typing import Any, Optional
+
+from fastapi import Response, status
+from pydantic import TypeAdapter
+
+
+def model_response(
+    adapter: TypeAdapter,
+    content: Any,
+    status_code: int = status.HTTP_200_OK,
+    headers: Optional[dict[str, str]] = None,
+) -> Response:
+    """Validate `content` (ORM objects) once and encode it straight to JSON.
+
+    Returning ORM objects makes FastAPI validate them into the response_model,
+    dump that to Python dicts and JSON-encode the dicts. A TypeAdapter built
+    once per route does a single validation pass and writes the JSON bytes
+    directly (pydantic-core). Keep response_model on the route for the docs.
+
+    Args:
+        adapter: e.g. TypeAdapter(list[schemas.ResponseBase]), built at import
+        content: ORM objects (or anything the adapter validates)
+        status_code, headers: of the response
+    Returns:
+        Response: application/json
+    """
+    body: bytes = adapter.dump_json(
+        adapter.validate_python(content, from_attributes=True)
+    )
+    return Response(
+        content=body,
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
@@ -0,0 +1,29 @@
+from typing import Any, Literal, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, func
+
+# substring: LIKE '%search%', ordered by id (cursor pagination)
+# fuzzy: trigram word similarity, most relevant first (skip pagination)
+SearchMode = Literal["substring", "fuzzy"]
+
+
+def fuzzy_search(
+    query: Select, column: Any, search: str, cursor: Optional[str]
+) -> Select:
+    """Filter `query` to rows whose `column` has a word similar to `search`.
+
+    Uses the pg_trgm `%>` operator, which the GIN trigram index on `column`
+    serves, and orders by word_similarity so the best matches come first.
+
+    Raises:
+        HTTPException: 400 Bad Request when combined with a cursor
+    """
+    if cursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor is not supported with search_mode=fuzzy, use skip",
+        )
+    return query.filter(column.op("%>")(search)).order_by(
+        func.word_similarity(search, column).desc()
+    )
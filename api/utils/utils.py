@@ -1,14 +1,118 @@
-from passlib.context import CryptContext
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from api import metrics
+from api.config import settings
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+# Bounded pool for bcrypt, created on first use
+_hash_executor: Optional[Executor] = None
+_hash_in_flight: int = 0  # submitted and not finished yet (queued + running)
+_hash_lock = threading.Lock()
+
+
+@functools.cache
+def get_pwd_context() -> "CryptContext":
+    """The bcrypt context, imported on first use to keep passlib (and bcrypt)
+    off the startup path."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def get_hash_executor() -> Executor:
+    """Get (or create) the password hashing pool.
+
+    bcrypt releases the GIL, so a thread pool scales with the number of cores;
+    a process pool is available for hashing backends that don't.
+
+    Returns:
+        Executor: with settings.PASSWORD_HASH_WORKERS workers
+    """
+    global _hash_executor
+    with _hash_lock:
+        if _hash_executor is None:
+            if settings.PASSWORD_HASH_EXECUTOR == "process":
+                _hash_executor = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS
+                )
+            else:
+                _hash_executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    thread_name_prefix="password-hash",
+                )
+        return _hash_executor
+
+
+def shutdown_hash_executor() -> None:
+    """Shut down the password hashing pool, waiting for running jobs."""
+    global _hash_executor
+    with _hash_lock:
+        if _hash_executor is not None:
+            _hash_executor.shutdown(wait=True)
+            _hash_executor = None
+
+
+def hash_pool_stats() -> dict[str, int]:
+    """Password hashing pool metrics.
+
+    Returns:
+        dict: workers, in_flight (queued + running) and queue_depth (waiting)
+    """
+    workers: int = settings.PASSWORD_HASH_WORKERS
+    in_flight: int = _hash_in_flight
+    return {
+        "workers": workers,
+        "in_flight": in_flight,
+        "queue_depth": max(0, in_flight - workers),
+    }
+
+
+async def _run_in_hash_pool(
+    operation: str, func: Callable[..., Any], *args: Any
+) -> Any:
+    global _hash_in_flight
+    with _hash_lock:
+        _hash_in_flight += 1
+        _export_hash_pool_stats()
+    try:
+        loop = asyncio.get_running_loop()
+        with metrics.PASSWORD_HASH_DURATION.labels(operation).time():
+            return await loop.run_in_executor(get_hash_executor(), func, *args)
+    finally:
+        with _hash_lock:
+            _hash_in_flight -= 1
+            _export_hash_pool_stats()
+
+
+def _export_hash_pool_stats() -> None:
+    """Set the GET /metrics gauges of hash_pool_stats (under _hash_lock)."""
+    stats: dict[str, int] = hash_pool_stats()
+    metrics.PASSWORD_HASH_IN_FLIGHT.set(stats["in_flight"])
+    metrics.PASSWORD_HASH_QUEUE_DEPTH.set(stats["queue_depth"])
+
+
+async def password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool("hash", password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(
+        "verify", verify_password, plain_password, hashed_password
+    )
 
 
 # password = "Password!128@#"
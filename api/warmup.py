@@ -0,0 +1,187 @@
+"""Startup warmup: the one-off costs the first requests of a worker would pay.
+
+Run by the lifespan of api.main in the background, GET /health/ready answers
+503 until it is done:
+
+- db: open WARMUP_DB_CONNECTIONS pooled connections of the primary at once
+  (connect, TLS handshake, auth), retried until the database answers
+- replicas: the same per read replica plus a lag check, so reads can go to
+  them from the first request (a replica that is down doesn't hold it up)
+- password_hashing: load passlib and the bcrypt backend and start the hash
+  pool with a cheap (4 rounds) verify
+- tokens: import jose and sign and decode a token
+- response_models: validate and serialize a post and a user through the
+  response schemas and the list adapters
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from api import oauth2, schemas, utils
+from api.config import settings
+from api.db import models
+from api.db.database import async_engine, read_replicas
+
+# bcrypt of "warmup" with 4 rounds: loads the backend without a full verify
+WARMUP_PASSWORD: str = "warmup"
+WARMUP_HASH: str = "$2b$04$9pUddmBGFHpl5LkxwoA7Iu0zHY9hb8jx5TaxyPqw1GRhre/Kx17Ei"
+
+DB_RETRY_MAX_SECONDS: float = 30.0
+
+
+class WarmupState:
+    """Progress of the warmup of this worker, reported by /health/ready."""
+
+    def __init__(self) -> None:
+        self.ready: bool = False
+        self.seconds: Optional[float] = None  # total, once done
+        self.steps: dict[str, float] = {}  # finished steps, in ms
+        self.errors: dict[str, str] = {}  # last error per step
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "seconds": self.seconds,
+            "steps": self.steps,
+            "errors": self.errors,
+        }
+
+
+state = WarmupState()
+
+
+async def _open(engine: AsyncEngine) -> AsyncConnection:
+    connection: AsyncConnection = await engine.connect()
+    try:
+        await connection.execute(text("SELECT 1"))
+    except BaseException:
+        await connection.close()
+        raise
+    return connection
+
+
+async def warm_pool(engine: AsyncEngine, connections: int) -> None:
+    """Open `connections` connections of `engine` at once, then return them
+    to its pool, where up to DB_POOL_SIZE of them stay open.
+
+    Raises:
+        Exception: the first connection error
+    """
+    opened: list[Any] = await asyncio.gather(
+        *(_open(engine) for _ in range(connections)), return_exceptions=True
+    )
+    for connection in opened:
+        if isinstance(connection, AsyncConnection):
+            await connection.close()
+    for error in opened:
+        if isinstance(error, BaseException):
+            raise error
+
+
+async def warm_db(connections: int) -> None:
+    """warm_pool of the primary, retried with backoff until it succeeds."""
+    delay: float = 1.0
+    while True:
+        try:
+            await warm_pool(async_engine, connections)
+            state.errors.pop("db", None)
+            return
+        except Exception as e:
+            state.errors["db"] = repr(e)
+            logger.warning("Warmup: database not reachable, retry in {}s", delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, DB_RETRY_MAX_SECONDS)
+
+
+async def warm_replicas(connections: int) -> None:
+    for replica in read_replicas.replicas:
+        try:
+            await warm_pool(replica.engine, connections)
+        except Exception as e:
+            state.errors["replicas"] = repr(e)
+            logger.warning("Warmup: read replica {} is down: {!r}", replica.name, e)
+        await replica.check()
+
+
+async def warm_password_hashing() -> None:
+    await utils.verify_password_async(WARMUP_PASSWORD, WARMUP_HASH)
+
+
+async def warm_tokens() -> None:
+    from jose import jwt  # oauth2 imports it on first use too
+
+    token: str = oauth2.create_access_token({"user_id": 0})
+    jwt.decode(token, oauth2.SECRET_KEY, algorithms=[oauth2.ALGORITHM])
+
+
+async def warm_response_models() -> None:
+    from api.routers.post import posts_adapter
+    from api.routers.user import users_adapter
+
+    now: datetime = datetime.now(timezone.utc)
+    owner = models.User(
+        id=0,
+        username="warmup",
+        email="warmup@example.com",
+        password=WARMUP_HASH,
+        user_created_at=now,
+        user_updated_at=now,
+        is_active=True,
+        is_superuser=False,
+    )
+    post = models.Posts(
+        id=0,
+        title="warmup",
+        content="warmup",
+        published=True,
+        post_created_at=now,
+        ratings=None,
+        owner_id=0,
+        owner=owner,
+    )
+    schemas.ResponseBase.model_validate(post, from_attributes=True).model_dump_json()
+    utils.responses.model_response(posts_adapter, [post])
+    utils.responses.model_response(users_adapter, [owner])
+
+
+async def run(connections: Optional[int] = None) -> None:
+    """Run every warmup step, then mark this worker ready.
+
+    Only the database is required: the other steps log their errors and the
+    first requests pay for whatever they didn't warm.
+
+    Args:
+        connections (int, optional): per engine, default WARMUP_DB_CONNECTIONS
+            (at most DB_POOL_SIZE)
+    """
+    if connections is None:
+        connections = min(settings.WARMUP_DB_CONNECTIONS, settings.DB_POOL_SIZE)
+    steps: dict[str, Callable[[], Awaitable[None]]] = {
+        "db": lambda: warm_db(connections),
+        "replicas": lambda: warm_replicas(connections),
+        "password_hashing": warm_password_hashing,
+        "tokens": warm_tokens,
+        "response_models": warm_response_models,
+    }
+    start: float = time.perf_counter()
+    for name, step in steps.items():
+        step_start: float = time.perf_counter()
+        try:
+            await step()
+        except Exception as e:
+            state.errors[name] = repr(e)
+            logger.exception("Warmup step {} failed", name)
+            continue
+        state.steps[name] = round((time.perf_counter() - step_start) * 1000, 1)
+    state.seconds = round(time.perf_counter() - start, 3)
+    state.ready = True
+    logger.info("Warmup done in {}s: {}", state.seconds, state.steps)
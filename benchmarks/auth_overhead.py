@@ -0,0 +1,98 @@
+"""Per-request cost of the auth dependencies, with and without the token cache.
+
+Times, per request (no database needed, the user record is pre-cached as it
+is after the first request of a user):
+
+- verify-uncached: oauth2.verify_access_token with an empty token cache
+  (jwt.decode, HMAC check, TokenData), what every request paid before
+- verify-cached: the same token again, served from oauth2.token_cache
+- dependencies-uncached / dependencies-cached: get_token_data followed by
+  get_current_user, the chain an authenticated route resolves
+
+Usage:
+    python -m benchmarks.auth_overhead --repeat 20000
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Callable
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from api import oauth2
+
+CLAIMS: dict[str, Any] = {
+    "user_id": 1,
+    "username": "bench",
+    "is_active": True,
+    "is_superuser": False,
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20_000)
+    return parser.parse_args()
+
+
+def summary(samples: list[float]) -> dict[str, float]:
+    samples.sort()
+    return {
+        "p50_us": round(statistics.median(samples), 2),
+        "p95_us": round(samples[int(0.95 * (len(samples) - 1))], 2),
+    }
+
+
+def timed_verify(token: str, repeat: int, cached: bool) -> dict[str, float]:
+    error = HTTPException(status_code=401)
+    samples: list[float] = []
+    for _ in range(repeat):
+        if not cached:
+            oauth2.token_cache.clear()
+        start: float = time.perf_counter()
+        oauth2.verify_access_token(token, error)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return summary(samples)
+
+
+async def timed_dependencies(token: str, repeat: int, cached: bool) -> dict:
+    request = Request({"type": "http", "headers": []})
+    samples: list[float] = []
+    for _ in range(repeat):
+        if not cached:
+            oauth2.token_cache.clear()
+        start: float = time.perf_counter()
+        token_data: Any = await oauth2.get_token_data(token)
+        await oauth2.get_current_user(request, token_data, db=None)
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    return summary(samples)
+
+
+def main() -> None:
+    args = parse_args()
+    results: dict[str, Any] = {"args": vars(args)}
+    token: str = oauth2.create_access_token(CLAIMS)
+    oauth2.user_cache.set(CLAIMS["user_id"], {"id": 1, **CLAIMS})
+    oauth2.token_cache.clear()
+
+    runs: dict[str, Callable[[], dict]] = {
+        "verify-uncached": lambda: timed_verify(token, args.repeat, cached=False),
+        "verify-cached": lambda: timed_verify(token, args.repeat, cached=True),
+        "dependencies-uncached": lambda: asyncio.run(
+            timed_dependencies(token, args.repeat, cached=False)
+        ),
+        "dependencies-cached": lambda: asyncio.run(
+            timed_dependencies(token, args.repeat, cached=True)
+        ),
+    }
+    for name, run in runs.items():
+        results[name] = run()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
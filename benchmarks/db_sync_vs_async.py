@@ -0,0 +1,103 @@
+"""Side-by-side throughput of the sync and async database paths.
+
+Every "request" is one `SELECT ... FROM users WHERE id = ?` plus `pg_sleep` to
+stand in for the network round trip to Neon. Three paths are compared:
+
+- sync-inline: sync Session called from an `async def` route (the old routers)
+- sync-threadpool: sync Session called from a `def` route (FastAPI threadpool)
+- async: AsyncSession from `api.db.database` (the current routers)
+
+Usage:
+    python -m benchmarks.db_sync_vs_async --requests 2000 --concurrency 200 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Callable, Coroutine
+
+import anyio
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.db import models
+from api.db.database import SQLALCHEMY_ASYNC_DATABASE_URL, SQLALCHEMY_DATABASE_URL
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--pool-size", type=int, default=20)
+    return parser.parse_args()
+
+
+async def drive(
+    handler: Callable[[], Coroutine[Any, Any, None]], requests: int, concurrency: int
+) -> dict[str, float]:
+    """Run `requests` calls of `handler`, at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await handler()
+
+    start: float = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed: float = time.perf_counter() - start
+    return {"seconds": round(elapsed, 3), "rps": round(requests / elapsed, 1)}
+
+
+async def main() -> None:
+    args = parse_args()
+    latency: str = f"SELECT pg_sleep({args.latency_ms / 1000})"
+    query = select(models.User).filter(models.User.id == 1)
+
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL, pool_size=args.pool_size, max_overflow=0
+    )
+    SessionLocal = sessionmaker(bind=engine)
+    async_engine = create_async_engine(
+        SQLALCHEMY_ASYNC_DATABASE_URL, pool_size=args.pool_size, max_overflow=0
+    )
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine)
+
+    def sync_request() -> None:
+        with SessionLocal() as db:
+            db.execute(text(latency))
+            db.scalar(query)
+
+    async def sync_inline() -> None:
+        sync_request()
+
+    async def sync_threadpool() -> None:
+        await anyio.to_thread.run_sync(sync_request)
+
+    async def async_request() -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(text(latency))
+            await db.scalar(query)
+
+    # Starlette's threadpool has 40 tokens by default, same as in production.
+    results: dict[str, Any] = {"args": vars(args)}
+    for name, handler in (
+        ("sync-inline", sync_inline),
+        ("sync-threadpool", sync_threadpool),
+    ):
+        await drive(handler, args.pool_size, args.pool_size)  # warm the pool
+        results[name] = await drive(handler, args.requests, args.concurrency)
+    # Close the sync pool so both engines never hold connections at once
+    engine.dispose()
+
+    await drive(async_request, args.pool_size, args.pool_size)
+    results["async"] = await drive(async_request, args.requests, args.concurrency)
+    await async_engine.dispose()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,187 @@
+"""GET /feed page latency by the number of users the reader follows.
+
+Seeds --authors fd_<n> users with --posts-per-author posts each and one
+reader fdr_<k> per --follows value, following k random authors, with
+their timelines fanned out as create_post would. Then times a page of
+--limit posts per reader, first page and a page --depth pages deep:
+
+- timeline: api.db.timeline.read, the precomputed timeline (GET /feed)
+- fan-out-on-read: the posts of all followed users merged at read time,
+  `WHERE owner_id IN (followees) ORDER BY id DESC LIMIT n`, for comparison
+
+Needs the follows migration (alembic upgrade head). The seeded users are
+deleted at the end (their posts, follows and timeline rows cascade).
+
+Usage:
+    python -m benchmarks.feed_latency --authors 20000 --posts-per-author 20 \
+        --follows 10 100 1000 5000 --repeat 50
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import joinedload
+
+from api.db import models, timeline
+from api.db.database import SQLALCHEMY_DATABASE_URL, async_engine
+from api.utils import password_hash
+
+from .load_test import LT_PASSWORD
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--authors", type=int, default=20_000)
+    parser.add_argument("--posts-per-author", type=int, default=20)
+    parser.add_argument("--follows", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    return parser.parse_args()
+
+
+def seed(connection: Any, args: argparse.Namespace) -> dict[int, int]:
+    """Insert the authors, posts, readers and follows, return reader ids by
+    follow count."""
+    password: str = password_hash(LT_PASSWORD)
+    connection.execute(text("DELETE FROM users WHERE username LIKE 'fd%\\_%'"))
+    connection.execute(
+        text(
+            "INSERT INTO users (username, email, password, is_active, is_superuser) "
+            "SELECT 'fd_' || g, 'fd_' || g || '@gmail.com', :password, true, false "
+            "FROM generate_series(1, :authors) g"
+        ),
+        {"password": password, "authors": args.authors},
+    )
+    connection.execute(
+        text(
+            "INSERT INTO posts (title, content, published, owner_id) "
+            "SELECT 'feed post ' || g, 'content of post ' || g, true, u.id "
+            "FROM generate_series(1, :posts) g, users u "
+            "WHERE u.username LIKE 'fd\\_%' ORDER BY g, u.id"
+        ),
+        {"posts": args.posts_per_author},
+    )
+    readers: dict[int, int] = {}
+    for follows in args.follows:
+        readers[follows] = connection.scalar(
+            text(
+                "INSERT INTO users (username, email, password) "
+                "VALUES ('fdr_' || :k, 'fdr_' || :k || '@gmail.com', :password) "
+                "RETURNING id"
+            ),
+            {"k": follows, "password": password},
+        )
+        connection.execute(
+            text(
+                "INSERT INTO follows (follower_id, followee_id) "
+                "SELECT :reader, id FROM users WHERE username LIKE 'fd\\_%' "
+                "ORDER BY random() LIMIT :follows"
+            ),
+            {"reader": readers[follows], "follows": follows},
+        )
+        # What create_post fanned out over time
+        connection.execute(
+            text(
+                "INSERT INTO timelines (user_id, post_id) "
+                "SELECT f.follower_id, p.id FROM follows f "
+                "JOIN posts p ON p.owner_id = f.followee_id "
+                "WHERE f.follower_id = :reader"
+            ),
+            {"reader": readers[follows]},
+        )
+    connection.execute(
+        text(
+            "UPDATE users u SET follower_count = c.n FROM (SELECT followee_id, "
+            "count(*) n FROM follows GROUP BY followee_id) c WHERE u.id = c.followee_id"
+        )
+    )
+    for table in ("users", "posts", "follows", "timelines"):
+        connection.execute(text(f"ANALYZE {table}"))
+    return readers
+
+
+async def fan_out_on_read(
+    db: AsyncSession, user_id: int, limit: int, before: Any
+) -> list[Any]:
+    query: Any = (
+        select(models.Posts)
+        .options(joinedload(models.Posts.owner))
+        .filter(
+            models.Posts.owner_id.in_(
+                select(models.Follow.followee_id).filter(
+                    models.Follow.follower_id == user_id
+                )
+            )
+        )
+    )
+    if before is not None:
+        query = query.filter(models.Posts.id < before)
+    return list(await db.scalars(query.order_by(models.Posts.id.desc()).limit(limit)))
+
+
+async def timed(
+    sessionmaker: async_sessionmaker,
+    read: Callable[..., Awaitable[list[Any]]],
+    user_id: int,
+    args: argparse.Namespace,
+) -> dict[str, float]:
+    results: dict[str, float] = {}
+    async with sessionmaker() as db:
+        # The id the page --depth pages deep starts below
+        before: Any = None
+        for _ in range(args.depth):
+            page: list[Any] = await read(db, user_id, args.limit, before)
+            before = page[-1].id
+        for name, cursor in (("first_page", None), ("deep_page", before)):
+            samples: list[float] = []
+            for _ in range(args.repeat):
+                start: float = time.perf_counter()
+                await read(db, user_id, args.limit, cursor)
+                samples.append((time.perf_counter() - start) * 1000)
+                db.expunge_all()
+            samples.sort()
+            results[f"{name}_p50_ms"] = round(statistics.median(samples), 2)
+            results[f"{name}_p95_ms"] = round(
+                samples[int(0.95 * (len(samples) - 1))], 2
+            )
+    return results
+
+
+async def measure(readers: dict[int, int], args: argparse.Namespace) -> dict:
+    sessionmaker = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+    report: dict[str, Any] = {}
+    for follows, user_id in readers.items():
+        report[f"follows={follows}"] = {
+            "timeline": await timed(sessionmaker, timeline.read, user_id, args),
+            "fan-out-on-read": await timed(
+                sessionmaker, fan_out_on_read, user_id, args
+            ),
+        }
+    await async_engine.dispose()
+    return report
+
+
+def main() -> None:
+    args = parse_args()
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    report: dict[str, Any] = {"args": vars(args)}
+    try:
+        with engine.begin() as connection:
+            readers: dict[int, int] = seed(connection, args)
+        report.update(asyncio.run(measure(readers, args)))
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM users WHERE username LIKE 'fd%\\_%'"))
+        engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
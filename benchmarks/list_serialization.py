@@ -0,0 +1,132 @@
+"""CPU cost of encoding a /posts/get (or /users/get) page, before and after.
+
+Builds --items transient ORM rows (no database needed) and times, per page:
+
+- fastapi-json: FastAPI's response_model path (validate the ORM objects,
+  dump them to dicts) rendered by the default JSONResponse (the old routes)
+- fastapi-orjson: the same path rendered by ORJSONResponse
+- type-adapter: utils.responses.model_response with the routes' pre-built
+  TypeAdapter, one validation pass straight to JSON bytes (the current routes)
+
+Usage:
+    python -m benchmarks.list_serialization --items 100 --repeat 2000
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import statistics
+import time
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api import schemas, utils
+from api.db import models
+from api.routers.post import posts_adapter
+from api.routers.user import users_adapter
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    return parser.parse_args()
+
+
+def make_users(items: int) -> list[models.User]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        models.User(
+            id=i,
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            password="x" * 60,
+            is_active=True,
+            is_superuser=False,
+            user_created_at=now,
+            user_updated_at=now,
+        )
+        for i in range(items)
+    ]
+
+
+def make_posts(items: int) -> list[models.Posts]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        models.Posts(
+            id=i,
+            title=f"post {i} title",
+            content="lorem ipsum dolor sit amet " * 5,
+            published=True,
+            post_created_at=now,
+            ratings=i % 5,
+            owner_id=owner.id,
+            owner=owner,
+        )
+        for i, owner in enumerate(make_users(items))
+    ]
+
+
+def timed(render: Callable[[], bytes], repeat: int) -> dict[str, float]:
+    """Median/p95 time in µs of `render` over `repeat` runs."""
+    samples: list[float] = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        render()
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    samples.sort()
+    return {
+        "p50_us": round(statistics.median(samples), 1),
+        "p95_us": round(samples[int(0.95 * (len(samples) - 1))], 1),
+    }
+
+
+def compare(schema: Any, adapter: Any, rows: list[Any], repeat: int) -> dict:
+    field = create_response_field(name="response", type_=list[schema])
+    loop = asyncio.new_event_loop()
+
+    def fastapi_path(response_class: type) -> Callable[[], bytes]:
+        def render() -> bytes:
+            content: Any = loop.run_until_complete(
+                serialize_response(field=field, response_content=rows)
+            )
+            return response_class(content).body
+
+        return render
+
+    candidates: dict[str, Callable[[], bytes]] = {
+        "fastapi-json": fastapi_path(JSONResponse),
+        "fastapi-orjson": fastapi_path(ORJSONResponse),
+        "type-adapter": lambda: utils.responses.model_response(adapter, rows).body,
+    }
+    # Same document either way
+    bodies: set[str] = {
+        json.dumps(json.loads(render()), sort_keys=True)
+        for render in candidates.values()
+    }
+    assert len(bodies) == 1, "encodings differ"
+    results: dict[str, Any] = {
+        name: timed(render, repeat) for name, render in candidates.items()
+    }
+    loop.close()
+    return results
+
+
+def main() -> None:
+    args = parse_args()
+    results: dict[str, Any] = {"args": vars(args)}
+    results["posts"] = compare(
+        schemas.ResponseBase, posts_adapter, make_posts(args.items), args.repeat
+    )
+    results["users"] = compare(
+        schemas.UserOut, users_adapter, make_users(args.items), args.repeat
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
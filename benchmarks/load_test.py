@@ -0,0 +1,279 @@
+"""Throughput and tail latency of the API routes under concurrent load.
+
+Seeds --users users (named lt_<n>, all with the password LT_PASSWORD) and
+--posts-per-user posts each, boots `api.main:app` with uvicorn (or uses
+--url), then drives one route at a time with --concurrency async clients:
+
+- POST /login (--login-requests, bcrypt bound, also yields the tokens)
+- GET /posts/get, /posts/id/{id}, /posts/latest, /users/get
+- POST /posts/create
+
+Every client uses the token of one seeded user and only touches that user's
+posts, as a real (non-superuser) client would. Per route it reports requests,
+errors, RPS and p50/p95/p99 latency as JSON, so runs can be diffed. Seeded
+users (and, by cascade, their posts) are deleted afterwards unless --keep.
+
+All clients share one IP, so the booted server runs with
+RATE_LIMIT_ENABLED=false (disable the limits of a --url server too).
+
+Needs a migrated database (alembic upgrade head). For a local stand-in of
+Neon, run Postgres with SSL (the API connects with sslmode=require):
+
+    docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres postgres:16 \\
+        -c ssl=on -c ssl_cert_file=/etc/ssl/certs/ssl-cert-snakeoil.pem \\
+        -c ssl_key_file=/etc/ssl/private/ssl-cert-snakeoil.key
+
+and point DB_HOSTNAME/DB_USERNAME/DB_PASS/DB_NAME in .env at it.
+
+Usage:
+    python -m benchmarks.load_test --users 100 --posts-per-user 100 \\
+        --requests 2000 --concurrency 50 --workers 1 --output run.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Optional
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from api.config import API_V1_STR
+from api.db.database import SQLALCHEMY_DATABASE_URL
+from api.utils import password_hash
+
+LT_PASSWORD: str = "Load_test1"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--posts-per-user", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--login-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="use a running server instead of booting one")
+    parser.add_argument("--output", help="also write the JSON report here")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded data")
+    return parser.parse_args()
+
+
+def seed(connection: Any, users: int, posts_per_user: int) -> dict[int, list[int]]:
+    """Insert the lt_<n> users and their posts, return post ids by owner id."""
+    connection.execute(text("DELETE FROM users WHERE username LIKE 'lt\\_%'"))
+    connection.execute(
+        text(
+            "INSERT INTO users (username, email, password, is_active, is_superuser) "
+            "SELECT 'lt_' || g, 'lt_' || g || '@gmail.com', :password, true, false "
+            "FROM generate_series(1, :users) g"
+        ),
+        {"password": password_hash(LT_PASSWORD), "users": users},
+    )
+    connection.execute(
+        text(
+            "INSERT INTO posts (title, content, published, owner_id) "
+            "SELECT 'load test post ' || g, 'content of post ' || g, true, u.id "
+            "FROM users u, generate_series(1, :posts) g "
+            "WHERE u.username LIKE 'lt\\_%'"
+        ),
+        {"posts": posts_per_user},
+    )
+    connection.execute(text("ANALYZE users"))
+    connection.execute(text("ANALYZE posts"))
+    posts: dict[int, list[int]] = {}
+    for post_id, owner_id in connection.execute(
+        text(
+            "SELECT p.id, p.owner_id FROM posts p JOIN users u ON u.id = p.owner_id "
+            "WHERE u.username LIKE 'lt\\_%'"
+        )
+    ):
+        posts.setdefault(owner_id, []).append(post_id)
+    return posts
+
+
+def start_server(args: argparse.Namespace) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "api.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(args.port),
+            "--workers",
+            str(args.workers),
+            "--log-level",
+            "warning",
+        ],
+        env={
+            **os.environ,
+            "RATE_LIMIT_ENABLED": "false",
+            "PYTHONPATH": os.pathsep.join(
+                [os.getcwd(), os.environ.get("PYTHONPATH", "")]
+            ),
+        },
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline: float = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get(f"{API_V1_STR}/description")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("server did not come up")
+        await asyncio.sleep(0.2)
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    request: Callable[[int], Any],
+    requests: int,
+    concurrency: int,
+) -> dict[str, Any]:
+    """Send `requests` requests, at most `concurrency` in flight.
+
+    `request(i)` returns the keyword arguments of client.request for the i-th
+    request. Latencies of failed (non-2xx) requests count too.
+    """
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    next_request: int = 0
+
+    async def worker() -> None:
+        nonlocal next_request
+        while next_request < requests:
+            i: int = next_request
+            next_request += 1
+            start: float = time.perf_counter()
+            try:
+                response: httpx.Response = await client.request(**request(i))
+                status: Optional[int] = response.status_code
+            except httpx.HTTPError as e:
+                status = None
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status is not None and not 200 <= status < 300:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    start: float = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed: float = time.perf_counter() - start
+    percentiles: list[float] = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentiles[49], 2),
+        "p95_ms": round(percentiles[94], 2),
+        "p99_ms": round(percentiles[98], 2),
+    }
+
+
+async def run(args: argparse.Namespace, posts: dict[int, list[int]]) -> dict:
+    url: str = args.url or f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(max_connections=args.concurrency)
+    results: dict[str, Any] = {}
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        await wait_ready(client)
+        owners: list[int] = sorted(posts)
+        users: list[str] = [f"lt_{n}@gmail.com" for n in range(1, args.users + 1)]
+
+        def login(i: int) -> dict[str, Any]:
+            return {
+                "method": "POST",
+                "url": f"{API_V1_STR}/login",
+                "data": {"username": users[i % len(users)], "password": LT_PASSWORD},
+            }
+
+        results["POST /login"] = await drive(
+            client, login, args.login_requests, args.concurrency
+        )
+        # One token per user, in owner id order (lt_1 has the lowest id)
+        tokens: list[str] = []
+        for i in range(len(users)):
+            response: httpx.Response = await client.request(**login(i))
+            tokens.append(response.json()["access_token"])
+
+        def as_user(i: int, method: str, path: str, **kwargs: Any) -> dict:
+            token: str = tokens[i % len(tokens)]
+            return {
+                "method": method,
+                "url": f"{API_V1_STR}{path}",
+                "headers": {"Authorization": f"Bearer {token}"},
+                **kwargs,
+            }
+
+        def own_post(i: int) -> int:
+            owned: list[int] = posts[owners[i % len(owners)]]
+            return owned[(i // len(owners)) % len(owned)]
+
+        latest: int = owners.index(max(owners, key=lambda owner: max(posts[owner])))
+        scenarios: dict[str, Callable[[int], dict]] = {
+            "GET /posts/get": lambda i: as_user(i, "GET", "/posts/get"),
+            "GET /posts/id/{id}": lambda i: as_user(
+                i, "GET", f"/posts/id/{own_post(i)}"
+            ),
+            # the latest post is only readable by its owner
+            "GET /posts/latest": lambda i: as_user(latest, "GET", "/posts/latest"),
+            "GET /users/get": lambda i: as_user(i, "GET", "/users/get"),
+            "POST /posts/create": lambda i: as_user(
+                i,
+                "POST",
+                "/posts/create",
+                json={"title": f"load test {i}", "content": "created under load"},
+            ),
+        }
+        for name, request in scenarios.items():
+            await drive(client, request, args.concurrency, args.concurrency)  # warm
+            results[name] = await drive(
+                client, request, args.requests, args.concurrency
+            )
+    return results
+
+
+def main() -> None:
+    args = parse_args()
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    report: dict[str, Any] = {"args": vars(args)}
+
+    start: float = time.perf_counter()
+    with engine.begin() as connection:
+        posts: dict[int, list[int]] = seed(connection, args.users, args.posts_per_user)
+    report["seed_seconds"] = round(time.perf_counter() - start, 1)
+
+    server: Optional[subprocess.Popen] = None if args.url else start_server(args)
+    try:
+        report["routes"] = asyncio.run(run(args, posts))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if not args.keep:
+            with engine.begin() as connection:
+                connection.execute(
+                    text("DELETE FROM users WHERE username LIKE 'lt\\_%'")
+                )
+        engine.dispose()
+
+    output: str = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Logging cost on the request path, old sinks vs the queued JSON pipeline.
+
+Times --records log calls on the calling thread (what a request waits for)
+with each sink setup, writing to a temporary directory and a null stderr:
+
+- sync-text: the old setup, text format, a synchronous stderr sink and a
+  file sink rotating every 100 KB
+- queued-json: setup_app_logging (JSON lines, stderr and the log file
+  written by QueuedStream threads, file rotation by LOGGING_FILE_ROTATION)
+- loguru-enqueue-json: the same with loguru's enqueue=True on both sinks,
+  for reference (it pickles every record through a multiprocessing queue)
+
+per_request_us is the cost of the log lines one GET /description used to
+write (its INFO line plus the uvicorn access line) against what it writes
+now (its line is DEBUG, the access line is sampled at
+LOGGING_ACCESS_SAMPLE_RATE).
+
+Usage:
+    python -m benchmarks.logging_overhead --records 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any
+
+from loguru import logger
+
+from api.config import _json_format, drain_app_logging, settings, setup_app_logging
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=20_000)
+    return parser.parse_args()
+
+
+def sync_text_setup() -> None:
+    log_format: str = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", format=log_format)
+    logger.add(
+        os.path.join("logs", "file_{time}.log"),
+        rotation="100 KB",
+        retention=1,
+        level="INFO",
+        format=log_format,
+    )
+
+
+def loguru_enqueue_setup() -> None:
+    logger.remove()
+    for sink, kwargs in (
+        (sys.stderr, {}),
+        (os.path.join("logs", "file_{time}.log"), {"rotation": "50 MB"}),
+    ):
+        logger.add(sink, level="INFO", format=_json_format, enqueue=True, **kwargs)
+
+
+def per_call_us(records: int) -> float:
+    """Mean µs per log call, as seen by the caller."""
+    start: float = time.perf_counter()
+    for i in range(records):
+        logger.info(
+            "GET /api/v1/description 200 {duration_ms}ms",
+            method="GET",
+            path="/api/v1/description",
+            status=200,
+            duration_ms=1.0,
+        )
+    elapsed: float = time.perf_counter() - start
+    drain_app_logging()  # drain the queues before the next setup
+    logger.complete()
+    return elapsed / records * 1_000_000
+
+
+def main() -> None:
+    args = parse_args()
+    results: dict[str, Any] = {"args": vars(args)}
+    stderr = sys.stderr
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as null:
+        os.chdir(directory)
+        sys.stderr = null
+        try:
+            sync_text_setup()
+            old: float = per_call_us(args.records)
+            setup_app_logging(config=settings)
+            new: float = per_call_us(args.records)
+            loguru_enqueue_setup()
+            enqueue: float = per_call_us(args.records)
+            logger.remove()
+        finally:
+            sys.stderr = stderr
+    results["per_call_us"] = {
+        "sync-text": round(old, 2),
+        "queued-json": round(new, 2),
+        "loguru-enqueue-json": round(enqueue, 2),
+    }
+    results["per_request_us"] = {
+        "before": round(2 * old, 2),
+        "after": round(settings.logging.LOGGING_ACCESS_SAMPLE_RATE * new, 2),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Post title search latency with and without the trigram index.
+
+Seeds a temporary copy of `posts` (same indexes, including ix_posts_title_trgm)
+with --rows rows, then times the /posts/get search queries:
+
+- substring-seqscan: LIKE '%search%' with index scans disabled (the old plan)
+- substring-trgm: LIKE '%search%' served by the GIN trigram index
+- fuzzy-trgm: search_mode=fuzzy, `title %> search` ordered by word_similarity
+
+Needs the trigram migration (alembic upgrade head). Nothing is written to the
+real tables; the temporary table goes away with the connection.
+
+Usage:
+    python -m benchmarks.search_latency --rows 1000000 --repeat 20
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Any
+
+from sqlalchemy import create_engine, text
+
+from api.db.database import SQLALCHEMY_DATABASE_URL
+
+SUBSTRING: str = (
+    "SELECT id FROM bench_posts WHERE title LIKE '%' || :search || '%' "
+    "ORDER BY id LIMIT 100"
+)
+FUZZY: str = (
+    "SELECT id FROM bench_posts WHERE title %> :search "
+    "ORDER BY word_similarity(:search, title) DESC, id LIMIT 100"
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    return parser.parse_args()
+
+
+def timed(connection: Any, sql: str, search: str, repeat: int) -> dict[str, float]:
+    """Median/p95 latency in ms of `sql` over `repeat` runs."""
+    samples: list[float] = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        connection.execute(text(sql), {"search": search}).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(samples[int(0.95 * (len(samples) - 1))], 2),
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    results: dict[str, Any] = {"args": vars(args)}
+
+    with engine.connect() as connection:
+        connection.execute(
+            text("CREATE TEMP TABLE bench_posts (LIKE posts INCLUDING INDEXES)")
+        )
+        start: float = time.perf_counter()
+        connection.execute(
+            text(
+                "INSERT INTO bench_posts (id, title, content, published, "
+                "post_created_at, owner_id) "
+                "SELECT g, 'post ' || g || ' ' || substr(md5(g::text), 1, 12), "
+                "'content', true, now(), 1 FROM generate_series(1, :rows) g"
+            ),
+            {"rows": args.rows},
+        )
+        connection.execute(text("ANALYZE bench_posts"))
+        results["seed_seconds"] = round(time.perf_counter() - start, 1)
+
+        # A rare (one row) and a common (~1 in 10 rows) search term
+        rare: str = connection.execute(
+            text("SELECT substr(md5('4242'), 3, 6)")
+        ).scalar_one()
+        for name, search in (("rare", rare), ("common", "post 12")):
+            connection.execute(text("SET enable_indexscan = off"))
+            connection.execute(text("SET enable_bitmapscan = off"))
+            seqscan = timed(connection, SUBSTRING, search, args.repeat)
+            connection.execute(text("RESET enable_indexscan"))
+            connection.execute(text("RESET enable_bitmapscan"))
+            results[name] = {
+                "search": search,
+                "substring-seqscan": seqscan,
+                "substring-trgm": timed(connection, SUBSTRING, search, args.repeat),
+                "fuzzy-trgm": timed(connection, FUZZY, search, args.repeat),
+            }
+        connection.rollback()
+
+    engine.dispose()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Cold start of the API: import time report and time to first response.
+
+- import_seconds: median wall time of `import api.main` in a fresh
+  interpreter, over --repeat runs
+- top_packages: cumulative `python -X importtime` time per top-level package
+  (self time of all its modules), the biggest first
+- lazy_modules: the modules the API imports on first use only, and whether
+  one slipped onto the startup path (should all be false)
+- first_response_seconds: from spawning uvicorn to the first 200 from
+  GET /description, what the first user after a scale-to-zero waits for
+
+Usage:
+    python -m benchmarks.startup --repeat 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+
+import httpx
+
+from api.config import API_V1_STR
+
+# Imported on first use (login, signup, token checks), never at startup
+LAZY_MODULES: tuple[str, ...] = ("jose", "passlib", "bcrypt", "openpyxl")
+
+IMPORT_API: str = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import api.main\n"
+    "print(json.dumps({'seconds': time.perf_counter() - start,\n"
+    "    'loaded': [m for m in sys.argv[1:] if m in sys.modules]}))\n"
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--port", type=int, default=8767)
+    return parser.parse_args()
+
+
+def env() -> dict[str, str]:
+    return {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join([os.getcwd(), os.environ.get("PYTHONPATH", "")]),
+    }
+
+
+def import_api() -> dict[str, Any]:
+    """Import api.main in a fresh interpreter, return its timing."""
+    output: str = subprocess.run(
+        [sys.executable, "-c", IMPORT_API, *LAZY_MODULES],
+        env=env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def top_packages(top: int) -> dict[str, float]:
+    """Self import time (ms) per top-level package, from -X importtime."""
+    stderr: str = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.main"],
+        env=env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    packages: dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, module = line[len("import time:") :].split("|")
+        package: str = module.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {package: round(ms, 1) for package, ms in ranked[:top]}
+
+
+def first_response(port: int) -> float:
+    start: float = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port)],
+        env=env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                response = httpx.get(
+                    f"http://127.0.0.1:{port}{API_V1_STR}/description", timeout=1
+                )
+                if response.status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            if time.perf_counter() - start > 60:
+                raise RuntimeError("server did not come up")
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    args = parse_args()
+    runs: list[dict[str, Any]] = [import_api() for _ in range(args.repeat)]
+    report: dict[str, Any] = {
+        "args": vars(args),
+        "import_seconds": round(statistics.median(r["seconds"] for r in runs), 3),
+        "top_packages_ms": top_packages(args.top),
+        "lazy_modules_loaded": {
+            module: module in runs[0]["loaded"] for module in LAZY_MODULES
+        },
+        "first_response_seconds": round(first_response(args.port), 3),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
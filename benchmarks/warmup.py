@@ -0,0 +1,131 @@
+"""Latency of the first requests after a boot, with and without the warmup.
+
+For WARMUP_ENABLED=false and true, boots uvicorn, waits until GET
+/health/ready answers 200 (at once without the warmup), then times the first
+and second request of each route in turn:
+
+- POST /login: bcrypt verify, first JWT signed
+- GET /posts/get: first JWT decoded, DB connection, list serialization
+- GET /posts/id/{id}: cached post serialization
+
+Reported per run: ready_seconds (spawn to ready) and first/second latency in
+ms per route. Needs a migrated database, the lt_1 user and its posts are
+seeded, then deleted (see load_test).
+
+Usage:
+    python -m benchmarks.warmup --repeat 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from api.config import API_V1_STR
+from api.db.database import SQLALCHEMY_DATABASE_URL
+
+from .load_test import LT_PASSWORD, seed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8768)
+    return parser.parse_args()
+
+
+def start_server(port: int, warmup: bool) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port)],
+        env={
+            **os.environ,
+            "WARMUP_ENABLED": str(warmup).lower(),
+            "RATE_LIMIT_ENABLED": "false",
+            "PYTHONPATH": os.pathsep.join(
+                [os.getcwd(), os.environ.get("PYTHONPATH", "")]
+            ),
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(client: httpx.Client, start: float) -> float:
+    while True:
+        try:
+            if client.get("/health/ready").status_code == 200:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass
+        if time.perf_counter() - start > 60:
+            raise RuntimeError("server did not get ready")
+        time.sleep(0.01)
+
+
+def timed(client: httpx.Client, method: str, url: str, **kwargs: Any) -> tuple:
+    start: float = time.perf_counter()
+    response: httpx.Response = client.request(method, url, **kwargs)
+    response.raise_for_status()
+    return (time.perf_counter() - start) * 1000, response
+
+
+def boot(port: int, warmup: bool, post_id: int) -> dict[str, Any]:
+    start: float = time.perf_counter()
+    server: subprocess.Popen = start_server(port, warmup)
+    result: dict[str, Any] = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            result["ready_seconds"] = wait_ready(client, start)
+            login: dict[str, str] = {
+                "username": "lt_1@gmail.com",
+                "password": LT_PASSWORD,
+            }
+            for attempt in ("first", "second"):
+                ms, response = timed(client, "POST", f"{API_V1_STR}/login", data=login)
+                result[f"login_{attempt}_ms"] = ms
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            for route, url in (
+                ("posts_get", f"{API_V1_STR}/posts/get"),
+                ("posts_id", f"{API_V1_STR}/posts/id/{post_id}"),
+            ):
+                for attempt in ("first", "second"):
+                    ms, _ = timed(client, "GET", url, headers=headers)
+                    result[f"{route}_{attempt}_ms"] = ms
+    finally:
+        server.terminate()
+        server.wait()
+    return result
+
+
+def main() -> None:
+    args = parse_args()
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    report: dict[str, Any] = {"args": vars(args)}
+    with engine.begin() as connection:
+        posts: dict[int, list[int]] = seed(connection, users=1, posts_per_user=10)
+    post_id: int = next(iter(posts.values()))[0]
+    try:
+        for warmup in (False, True):
+            runs: list[dict[str, Any]] = [
+                boot(args.port, warmup, post_id) for _ in range(args.repeat)
+            ]
+            report[f"warmup={str(warmup).lower()}"] = {
+                key: round(statistics.median(run[key] for run in runs), 3)
+                for key in runs[0]
+            }
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM users WHERE username LIKE 'lt\\_%'"))
+        engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Memory per worker and throughput of the gunicorn launcher by worker count.
+
+For every --workers value, boots `gunicorn -c gunicorn.conf.py api.main:app`
+with WEB_CONCURRENCY set to it, then reports:
+
+- memory of the master and each worker from /proc/<pid>/smaps_rollup: RSS,
+  PSS (shared pages split between the processes sharing them) and USS
+  (pages only that process has, what another worker really costs)
+- RPS and p50/p99 of GET /posts/get and GET /description, driven like
+  benchmarks.load_test (its lt_<n> users and posts are seeded, then deleted)
+
+Linux only (smaps_rollup). Needs a migrated database, see load_test.
+
+Usage:
+    python -m benchmarks.workers --workers 1 2 4 --requests 4000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Any
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from api.config import API_V1_STR
+from api.db.database import SQLALCHEMY_DATABASE_URL
+
+from .load_test import LT_PASSWORD, drive, seed, wait_ready
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8766)
+    return parser.parse_args()
+
+
+def memory_kb(pid: int) -> dict[str, int]:
+    """RSS, PSS and USS of `pid` in kB."""
+    fields: dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[name] = int(value.split()[0])
+    return {
+        "rss_kb": fields["Rss"],
+        "pss_kb": fields["Pss"],
+        "uss_kb": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def children(pid: int) -> list[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def start_gunicorn(workers: int, port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "api.main:app"],
+        env={
+            **os.environ,
+            "WEB_CONCURRENCY": str(workers),
+            "PORT": str(port),
+            # All clients share one IP
+            "RATE_LIMIT_ENABLED": "false",
+            "PYTHONPATH": os.pathsep.join(
+                [os.getcwd(), os.environ.get("PYTHONPATH", "")]
+            ),
+        },
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def measure(args: argparse.Namespace, master: int) -> dict[str, Any]:
+    url: str = f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        await wait_ready(client)
+        response: httpx.Response = await client.post(
+            f"{API_V1_STR}/login",
+            data={"username": "lt_1@gmail.com", "password": LT_PASSWORD},
+        )
+        headers: dict[str, str] = {
+            "Authorization": f"Bearer {response.json()['access_token']}"
+        }
+        routes: dict[str, Any] = {
+            "GET /posts/get": lambda i: {
+                "method": "GET",
+                "url": f"{API_V1_STR}/posts/get",
+                "headers": headers,
+            },
+            "GET /description": lambda i: {
+                "method": "GET",
+                "url": f"{API_V1_STR}/description",
+            },
+        }
+        results: dict[str, Any] = {}
+        for name, request in routes.items():
+            await drive(client, request, args.concurrency, args.concurrency)  # warm
+            results[name] = await drive(
+                client, request, args.requests, args.concurrency
+            )
+    # After the load, so the workers' heaps have grown to their working size
+    results["memory"] = {
+        "master": memory_kb(master),
+        "workers": [memory_kb(pid) for pid in children(master)],
+    }
+    return results
+
+
+def main() -> None:
+    args = parse_args()
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    report: dict[str, Any] = {"args": vars(args), "cpus": len(os.sched_getaffinity(0))}
+    with engine.begin() as connection:
+        seed(connection, users=1, posts_per_user=100)
+    try:
+        for workers in args.workers:
+            server: subprocess.Popen = start_gunicorn(workers, args.port)
+            try:
+                report[f"workers={workers}"] = asyncio.run(measure(args, server.pid))
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait()
+            time.sleep(1)  # let the port go
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM users WHERE username LIKE 'lt\\_%'"))
+        engine.dispose()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Production server: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py api.main:app
+
+- One worker per CPU available to the process (WEB_CONCURRENCY overrides);
+  uvicorn picks uvloop and httptools when they are installed.
+- The app is imported once in the master (preload_app) and gc.freeze()
+  moves everything it allocated out of the collector's reach, so pages
+  stay shared copy-on-write with the forked workers.
+- Every worker drops the DB connections it inherited and opens its own,
+  and gets its own log file.
+- Client IPs are taken from X-Forwarded-For of FORWARDED_ALLOW_IPS
+  (default any peer), so each client behind the proxy has its own rate
+  limit bucket.
+- SIGTERM drains: workers stop accepting, finish in-flight requests for up
+  to GRACEFUL_TIMEOUT seconds and run the app's lifespan shutdown.
+
+Development still uses `uvicorn api.main:app --reload`.
+"""
+
+import gc
+import os
+from typing import Any
+
+
+def _cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))  # respects cpusets / taskset
+    except AttributeError:  # pragma: no cover (macOS)
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8001')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", _cpus()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+keepalive = 5
+# Replaced by the request log of RequestLogMiddleware
+accesslog = None
+# Proxies whose X-Forwarded-For is the client IP (per-IP rate limits of
+# api.rate_limits). "*" trusts any peer, for platforms where only their proxy
+# reaches the server (Render): the client IP is then the first entry, which
+# a client can forge unless the proxy overwrites the header. List the
+# proxies' addresses where they are known
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "*")
+
+
+def when_ready(server: Any) -> None:
+    # After the preloaded app: objects allocated so far are never collected
+    # (nor touched by the collector), so forking doesn't copy their pages
+    gc.freeze()
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    from api.config import settings, setup_app_logging
+    from api.db.database import async_engine, engine, read_replicas
+
+    # Connections (if any) belong to the master: forget them without closing
+    # them (close=False) so the master's sockets are left alone
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    for replica in read_replicas.replicas:
+        replica.engine.sync_engine.dispose(close=False)
+    # One log file per worker (file_<pid>_<time>.log), so workers don't
+    # rotate each other's file. Retention covers the files of all of them
+    setup_app_logging(config=settings)
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
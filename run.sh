@@ -1 +1 @@
-uvicorn api.main:app --host 0.0.0.0 --port 8001 --reload
\ No newline at end of file
+exec gunicorn -c gunicorn.conf.py api.main:app